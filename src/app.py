@@ -1,52 +1,133 @@
 import os
 import json
+import asyncio
+import logging
+import threading
 from typing import Dict, Any
+import numpy as np
 import uvicorn
-from fastapi import FastAPI, Body
-from fastapi.responses import HTMLResponse
-import requests
-from bs4 import BeautifulSoup
-from .shl.indexer import load_catalog
-from .shl.recommender import Recommender
+from fastapi import FastAPI, Body, HTTPException, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from .shl.indexer import CATALOG_PATH
+from .shl.batcher import MicroBatcher
+from .shl.encoder import MODEL_NAME, encoder_name
+from .shl.filters import FILTER_KEYS, normalize_filters
+from .shl.jdfetch import JDFetcher
+from .shl.metrics import REGISTRY, SERVER_TIMING, capture, timed, server_timing_header
+from .shl.querypre import prepare
+from .shl.recommender import Recommender, normalize_query
 from .shl.scraper import run as scrape_run
 from .shl.indexer import index as index_run
 
 
 app = FastAPI()
+logger = logging.getLogger("uvicorn.error")
 catalog_items = 0
 rec = None
+bootstrap_error = None
+jd_fetcher = JDFetcher()
+encode_batcher = MicroBatcher(lambda texts: rec.embed(texts))
 
 
-def jd_from_url(u: str) -> str:
-    hdrs = {"User-Agent": "Mozilla/5.0"}
-    try:
-        r = requests.get(u, headers=hdrs, timeout=30)
-        soup = BeautifulSoup(r.text, "html.parser")
-        for s in soup(["script", "style", "noscript"]):
-            s.decompose()
-        txt = " ".join(soup.get_text(separator=" ").split())
-        return txt[:5000]
-    except Exception:
-        return ""
+def cache_metric(field: str) -> Dict[str, float]:
+    out = {'cache="jd"': jd_fetcher.cache.stats()[field]}
+    if rec is not None:
+        for name, st in rec.cache_stats().items():
+            out['cache="%s"' % name] = st[field]
+    return out
 
 
-@app.on_event("startup")
-def on_startup():
-    global catalog_items, rec
-    catalog_items = len(load_catalog())
-    if catalog_items == 0:
+REGISTRY.gauge("shl_catalog_items", "Documents in the loaded catalog.", lambda: catalog_items)
+REGISTRY.gauge("shl_ready", "1 when the index and encoder are loaded.", lambda: int(rec is not None and rec.ready()))
+REGISTRY.gauge("shl_cache_hits_total", "Cache hits.", lambda: cache_metric("hits"), kind="counter")
+REGISTRY.gauge("shl_cache_misses_total", "Cache misses.", lambda: cache_metric("misses"), kind="counter")
+REGISTRY.gauge("shl_cache_hit_rate", "Cache hit rate since start.", lambda: cache_metric("hit_rate"))
+REGISTRY.gauge("shl_batcher_queue_depth", "Queries waiting for the encoder.", lambda: encode_batcher.stats()["queue_depth"])
+REGISTRY.gauge("shl_batcher_batches_total", "Encoder batches run.", lambda: encode_batcher.batches, kind="counter")
+REGISTRY.gauge("shl_batcher_items_total", "Queries encoded through the batcher.", lambda: encode_batcher.items, kind="counter")
+
+
+async def jd_from_url(u: str) -> str:
+    return await jd_fetcher.fetch(u)
+
+
+def bootstrap():
+    global catalog_items, rec, bootstrap_error
+    if not os.path.exists(CATALOG_PATH) or os.path.getsize(CATALOG_PATH) == 0:
         try:
             scrape_run()
             index_run()
         except Exception:
-            pass
-        catalog_items = len(load_catalog())
-    rec = Recommender()
+            logger.exception("initial scrape/index failed")
+    try:
+        r = Recommender()
+    except Exception as e:
+        logger.exception("failed to load the recommender")
+        bootstrap_error = e
+        return
+    catalog_items = r.n_docs
+    rec = r
+
+
+def startup_error() -> Any:
+    e = bootstrap_error or (rec.model_error if rec is not None else None)
+    return None if e is None else "%s: %s" % (type(e).__name__, e)
+
+
+def get_rec(need_model: bool = True) -> Recommender:
+    error = startup_error()
+    if error is not None:
+        raise HTTPException(status_code=503, detail=error)
+    if rec is None or (need_model and not rec.ready()):
+        raise HTTPException(status_code=503, detail="warming up", headers={"Retry-After": "5"})
+    return rec
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    if not SERVER_TIMING:
+        return await call_next(request)
+    with capture() as d:
+        with timed("total"):
+            response = await call_next(request)
+    response.headers["Server-Timing"] = server_timing_header(d)
+    return response
+
+
+@app.on_event("startup")
+def on_startup():
+    if rec is None:
+        threading.Thread(target=bootstrap, daemon=True).start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await jd_fetcher.close()
+    await encode_batcher.close()
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "catalog_items": catalog_items, "embedding_model": "all-MiniLM-L6-v2"}
+    error = startup_error()
+    return {
+        "status": "ok" if error is None else "error",
+        "error": error,
+        "ready": rec is not None and rec.ready(),
+        "index_loaded": rec is not None,
+        "model_loaded": rec is not None and rec.ready(),
+        "catalog_items": catalog_items,
+        "embedding_model": MODEL_NAME,
+        "encoder": rec.encoder if rec is not None else encoder_name(),
+        "cache": rec.cache_stats() if rec is not None else {},
+        "jd_cache": jd_fetcher.cache.stats(),
+        "batcher": encode_batcher.stats(),
+    }
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 
 @app.get("/", response_class=HTMLResponse)
 def index():
@@ -96,22 +177,69 @@ def index():
     return HTMLResponse(content=html)
 
 
+def parse_filters(payload: Dict[str, Any]):
+    filters = payload.get("filters") or {k: payload[k] for k in FILTER_KEYS if k in payload}
+    try:
+        return normalize_filters(filters)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail="invalid filters: %s" % e)
+
+
+async def resolve_query(input_type: str, query: str) -> str:
+    if input_type == "jd_url":
+        q = await jd_from_url(query)
+        if q:
+            query = q
+    return query
+
+
 @app.post("/recommend")
-def recommend(payload: Dict[str, Any] = Body(...)):
+async def recommend(payload: Dict[str, Any] = Body(...)):
     input_type = payload.get("input_type", "text")
     query = payload.get("query", "") or ""
     top_k = int(payload.get("top_k", 10))
-    if input_type == "jd_url":
-        q = jd_from_url(query)
-        if q:
-            query = q
-    if input_type == "jd_text":
-        query = query
-    items = rec.recommend(query=query, k=max(5, min(10, top_k)))
+    filters = parse_filters(payload)
+    query = await resolve_query(input_type, query)
+    r = get_rec()
+    k = max(5, min(10, top_k))
+    items = r.lookup(query, k, filters)
+    if items is None:
+        items = await run_in_threadpool(r.resolve, query, k, filters)
+    if items is None:
+        chunks, _ = prepare(normalize_query(query))
+        with timed("encode_wait"):
+            embs = await asyncio.gather(*(encode_batcher.submit(c) for c in chunks))
+        items = (await run_in_threadpool(r.compute_many, [query], k, [np.vstack(embs)], filters, False))[0]
     out = [{"name": it["name"], "url": it["url"], "type": it.get("type", "")} for it in items]
     return {"items": out}
 
 
+@app.get("/autocomplete")
+def autocomplete(q: str = "", limit: int = 10):
+    r = get_rec(need_model=False)
+    return {"query": q, "suggestions": r.autocomplete(q, max(1, min(50, limit)))}
+
+
+@app.post("/recommend/batch")
+async def recommend_batch(payload: Dict[str, Any] = Body(...)):
+    input_type = payload.get("input_type", "text")
+    top_k = int(payload.get("top_k", 10))
+    filters = parse_filters(payload)
+    r = get_rec()
+    pending = []
+    for q in payload.get("queries", []) or []:
+        if isinstance(q, dict):
+            pending.append(resolve_query(q.get("input_type", input_type), q.get("query", "") or ""))
+        else:
+            pending.append(resolve_query(input_type, str(q or "")))
+    queries = await asyncio.gather(*pending)
+    results = await run_in_threadpool(r.recommend_many, list(queries), max(5, min(10, top_k)), filters)
+    out = []
+    for items in results:
+        out.append({"items": [{"name": it["name"], "url": it["url"], "type": it.get("type", "")} for it in items]})
+    return {"results": out}
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     uvicorn.run("src.app:app", host="0.0.0.0", port=port, reload=False)
@@ -0,0 +1,136 @@
+import os
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+
+ANN_NLIST = int(os.getenv("SHL_ANN_NLIST", "0"))
+ANN_NPROBE = int(os.getenv("SHL_ANN_NPROBE", "32"))
+ANN_RERANK = int(os.getenv("SHL_ANN_RERANK", "4"))
+ANN_SUBDIM = int(os.getenv("SHL_ANN_SUBDIM", "8"))
+ANN_MIN_DOCS = int(os.getenv("SHL_ANN_MIN_DOCS", "5000"))
+ANN_TRAIN_SAMPLE = int(os.getenv("SHL_ANN_TRAIN_SAMPLE", "25000"))
+ANN_ITERS = 12
+KSUB = 256
+PQ_TRAIN = KSUB * 40
+ASSIGN_CHUNK = 8192
+
+
+def auto_nlist(n: int) -> int:
+    return int(np.clip(4 * np.sqrt(n), 16, 4096))
+
+
+def nearest(x: np.ndarray, c: np.ndarray) -> np.ndarray:
+    half = 0.5 * (c * c).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int64)
+    for i in range(0, len(x), ASSIGN_CHUNK):
+        out[i : i + ASSIGN_CHUNK] = np.argmax(np.asarray(x[i : i + ASSIGN_CHUNK], dtype=np.float32) @ c.T - half, axis=1)
+    return out
+
+
+def kmeans(x: np.ndarray, k: int, iters: int = ANN_ITERS, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    c = x[rng.choice(len(x), k, replace=False)].astype(np.float32)
+    for _ in range(iters):
+        assign = nearest(x, c)
+        order = np.argsort(assign, kind="stable")
+        labels, starts, counts = np.unique(assign[order], return_index=True, return_counts=True)
+        c[labels] = np.add.reduceat(x[order], starts, axis=0) / counts[:, None]
+        empty = np.setdiff1d(np.arange(k), labels)
+        if len(empty):
+            c[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+    return c
+
+
+class IVFPQIndex:
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        codebooks: np.ndarray,
+        codes: np.ndarray,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        source: Optional[np.ndarray] = None,
+    ):
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.codes = codes
+        self.order = order
+        self.offsets = offsets
+        self.source = np.zeros(2, dtype=np.int64) if source is None else source
+        self.n_docs = len(order)
+        self.m, self.ksub, self.dsub = codebooks.shape
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: int = ANN_NLIST, subdim: int = ANN_SUBDIM, seed: int = 0) -> "IVFPQIndex":
+        n, dim = matrix.shape
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(n, min(n, ANN_TRAIN_SAMPLE), replace=False))
+        train = np.asarray(matrix[sample], dtype=np.float32)
+        centroids = kmeans(train, nlist or auto_nlist(n), seed=seed)
+        dsub = subdim if subdim and dim % subdim == 0 else 1
+        m = dim // dsub
+        pick = rng.choice(len(train), min(len(train), PQ_TRAIN), replace=False)
+        resid = (train[pick] - centroids[nearest(train[pick], centroids)]).reshape(-1, m, dsub)
+        codebooks = np.stack([kmeans(np.ascontiguousarray(resid[:, j]), KSUB, seed=seed + j) for j in range(m)])
+        assign = nearest(matrix, centroids)
+        codes = np.empty((n, m), dtype=np.uint8)
+        for i in range(0, n, ASSIGN_CHUNK):
+            r = np.asarray(matrix[i : i + ASSIGN_CHUNK], dtype=np.float32) - centroids[assign[i : i + ASSIGN_CHUNK]]
+            r = r.reshape(len(r), m, dsub)
+            for j in range(m):
+                codes[i : i + ASSIGN_CHUNK, j] = nearest(r[:, j], codebooks[j])
+        order = np.argsort(assign, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=len(centroids)))
+        return cls(centroids, codebooks, codes[order], order, offsets)
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp.npz"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                codebooks=self.codebooks,
+                codes=self.codes,
+                order=self.order,
+                offsets=self.offsets,
+                source=self.source,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFPQIndex":
+        with np.load(path) as z:
+            return cls(z["centroids"], z["codebooks"], z["codes"], z["order"], z["offsets"], z["source"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "n_docs": self.n_docs,
+            "nlist": len(self.centroids),
+            "subquantizers": self.m,
+            "code_bytes": int(self.codes.nbytes),
+        }
+
+    def search(
+        self, q: np.ndarray, shortlist: int, nprobe: int = ANN_NPROBE, mask: Optional[np.ndarray] = None
+    ) -> List[np.ndarray]:
+        q = np.asarray(q, dtype=np.float32)
+        coarse = q @ self.centroids.T
+        luts = np.einsum("qmd,mkd->qmk", q.reshape(len(q), self.m, self.dsub), self.codebooks)
+        cols = np.arange(self.m)
+        out = []
+        for qi in range(len(q)):
+            probe = np.argsort(-coarse[qi], kind="stable")[: min(nprobe, len(self.centroids))]
+            spans = [(self.offsets[p], self.offsets[p + 1]) for p in probe]
+            pos = np.concatenate([np.arange(a, b) for a, b in spans]) if spans else np.zeros(0, dtype=np.int64)
+            base = np.repeat(coarse[qi, probe], [b - a for a, b in spans])
+            if mask is not None:
+                keep = mask[self.order[pos]]
+                pos, base = pos[keep], base[keep]
+            approx = base + luts[qi][cols, self.codes[pos]].sum(axis=1)
+            if shortlist < len(approx):
+                top = np.argpartition(-approx, shortlist - 1)[:shortlist]
+                pos = pos[top]
+            out.append(np.sort(self.order[pos]))
+        return out
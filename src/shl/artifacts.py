@@ -0,0 +1,67 @@
+import os
+import json
+import shutil
+from typing import List, Dict, Any, Optional
+from .bm25 import InvertedBM25, tokenize
+from .catalog_schema import Assessment, build_text
+from .filters import FilterIndex
+from .strtab import save_strings, StringTable
+
+
+ARTIFACTS_DIR = "data/artifacts"
+META_FIELDS = ["id", "name", "url", "type"]
+ARTIFACTS_VERSION = 2
+SEP = "\x1f"
+
+
+def catalog_signature(catalog_path: str) -> Dict[str, int]:
+    if not os.path.exists(catalog_path):
+        return {}
+    st = os.stat(catalog_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def build_artifacts(items: List[Assessment]) -> Dict[str, Any]:
+    corpus = [tokenize(build_text(a)) for a in items]
+    art = {f: [getattr(a, f) for a in items] for f in META_FIELDS}
+    art["skills"] = [list(a.skills or []) for a in items]
+    art["bm25"] = InvertedBM25(corpus) if corpus else None
+    art["filters"] = FilterIndex.build(items)
+    return art
+
+
+def save_artifacts(art: Dict[str, Any], catalog_path: str, path: str = ARTIFACTS_DIR) -> None:
+    tmp = path + ".tmp"
+    old = path + ".old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for f in META_FIELDS:
+        save_strings(os.path.join(tmp, f), art[f])
+    save_strings(os.path.join(tmp, "skills"), [SEP.join(x) for x in art["skills"]])
+    if art["bm25"] is not None:
+        art["bm25"].save(os.path.join(tmp, "bm25"))
+    art["filters"].save(os.path.join(tmp, "filters.npz"))
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as fh:
+        manifest = {"version": ARTIFACTS_VERSION, "n_docs": len(art["id"]), "catalog": catalog_signature(catalog_path)}
+        json.dump(manifest, fh)
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_artifacts(catalog_path: str, path: str = ARTIFACTS_DIR) -> Optional[Dict[str, Any]]:
+    mpath = os.path.join(path, "manifest.json")
+    if not os.path.exists(mpath) or not os.path.exists(os.path.join(path, "filters.npz")):
+        return None
+    with open(mpath, "r", encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("version") != ARTIFACTS_VERSION or manifest.get("catalog") != catalog_signature(catalog_path):
+        return None
+    n = manifest["n_docs"]
+    art = {f: StringTable(os.path.join(path, f)).tolist() for f in META_FIELDS}
+    art["skills"] = [x.split(SEP) if x else [] for x in StringTable(os.path.join(path, "skills"))]
+    art["bm25"] = InvertedBM25.load(os.path.join(path, "bm25"), n) if n else None
+    art["filters"] = FilterIndex.load(os.path.join(path, "filters.npz"), n)
+    return art
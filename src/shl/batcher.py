@@ -0,0 +1,96 @@
+import os
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+
+BATCH_WINDOW_MS = float(os.getenv("SHL_BATCH_WINDOW_MS", "5"))
+BATCH_MAX = int(os.getenv("SHL_BATCH_MAX", "32"))
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        fn: Callable[[List[str]], np.ndarray],
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch: int = BATCH_MAX,
+    ):
+        self.fn = fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.last_batch_size = 0
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, text: str) -> np.ndarray:
+        if self.task is None or self.task.done():
+            self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, fut))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await fut
+
+    async def collect(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.collect()
+            batch = [(t, f) for t, f in batch if not f.cancelled()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            self.last_batch_size = len(batch)
+            try:
+                embs = await loop.run_in_executor(None, self.fn, [t for t, _ in batch])
+                for (_, f), e in zip(batch, embs):
+                    if not f.done():
+                        f.set_result(e)
+            except Exception as e:
+                for _, f in batch:
+                    if not f.done():
+                        f.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+        }
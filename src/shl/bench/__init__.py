@@ -0,0 +1,3 @@
+from .ann import run_ann_bench, ANN_SIZES, NPROBES, RERANKS
+from .runner import run_bench, SIZES
+from .synth import make_catalog, make_queries, write_catalog
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
+from ..ann import IVFPQIndex, ANN_NLIST
+from ..catalog_schema import now_iso
+from ..encoder import load_encoder
+from ..vectorstore import top_k
+from .runner import RESULTS_DIR, environment, latency_stats
+from .synth import make_catalog, make_queries
+
+
+ANN_SIZES = [100000]
+NPROBES = [1, 4, 8, 16, 32, 64]
+RERANKS = [1, 4, 16]
+
+
+def encode_corpus(size: int, encoder: str, seed: int, batch: int = 4096) -> np.ndarray:
+    model = load_encoder(encoder)
+    texts = [a.name + " " + a.description for a in make_catalog(size, seed)]
+    parts = [model.encode(texts[i : i + batch], normalize_embeddings=True) for i in range(0, len(texts), batch)]
+    return np.vstack(parts).astype(np.float32)
+
+
+def exact_search(matrix: np.ndarray, q: np.ndarray, k: int) -> np.ndarray:
+    return top_k(matrix @ q, k)
+
+
+def ann_search(index: IVFPQIndex, matrix: np.ndarray, q: np.ndarray, k: int, nprobe: int, rerank: int) -> np.ndarray:
+    cand = index.search(q[None, :], k * rerank, nprobe)[0]
+    return cand[top_k(matrix[cand] @ q, k)]
+
+
+def run_ann_size(
+    size: int, encoder: str, n_queries: int, k: int, nprobes: List[int], reranks: List[int], nlist: int, seed: int
+) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"size": size}
+    t0 = time.perf_counter()
+    matrix = encode_corpus(size, encoder, seed)
+    out["encode_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    index = IVFPQIndex.build(matrix, nlist=nlist, seed=seed)
+    out["build_s"] = time.perf_counter() - t0
+    out["index"] = index.stats()
+    out["index"]["raw_bytes"] = int(matrix.nbytes)
+    queries = load_encoder(encoder).encode(make_queries(n_queries, seed + 1), normalize_embeddings=True).astype(np.float32)
+    exact = []
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        exact.append(set(exact_search(matrix, q, k).tolist()))
+        lat.append(time.perf_counter() - t0)
+    out["exact"] = latency_stats(lat)
+    out["settings"] = []
+    for rerank in reranks:
+        for nprobe in nprobes:
+            lat = []
+            hits = 0
+            for q, truth in zip(queries, exact):
+                t0 = time.perf_counter()
+                got = ann_search(index, matrix, q, k, nprobe, rerank)
+                lat.append(time.perf_counter() - t0)
+                hits += len(truth & set(got.tolist()))
+            row = {"nprobe": nprobe, "rerank": rerank, "recall@%d" % k: hits / float(max(1, len(exact) * k))}
+            row.update(latency_stats(lat))
+            out["settings"].append(row)
+    return out
+
+
+def run_ann_bench(
+    sizes: Optional[List[int]] = None,
+    encoder: str = "hash",
+    n_queries: int = 200,
+    k: int = 50,
+    nprobes: Optional[List[int]] = None,
+    reranks: Optional[List[int]] = None,
+    nlist: int = ANN_NLIST,
+    seed: int = 0,
+    output: Optional[str] = None,
+) -> Dict[str, Any]:
+    sizes = sizes or ANN_SIZES
+    nprobes = nprobes or NPROBES
+    reranks = reranks or RERANKS
+    result = {
+        "started": now_iso(),
+        "env": environment(),
+        "config": {
+            "sizes": sizes,
+            "encoder": encoder,
+            "queries": n_queries,
+            "k": k,
+            "nprobes": nprobes,
+            "reranks": reranks,
+            "nlist": nlist,
+            "seed": seed,
+        },
+        "runs": [run_ann_size(size, encoder, n_queries, k, nprobes, reranks, nlist, seed) for size in sizes],
+    }
+    result["finished"] = now_iso()
+    if output is None:
+        output = os.path.join(RESULTS_DIR, "ann-%s.json" % result["started"].replace(":", ""))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    result["output"] = output
+    return result
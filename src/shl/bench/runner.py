@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+import numpy as np
+from ..catalog_schema import now_iso
+from .synth import write_catalog, make_queries
+
+
+SIZES = [400, 10000, 100000]
+RESULTS_DIR = os.path.join("outputs", "bench")
+
+
+def latency_stats(xs: List[float]) -> Dict[str, float]:
+    if not xs:
+        return {}
+    a = np.asarray(xs) * 1000.0
+    return {
+        "n": len(xs),
+        "mean_ms": float(a.mean()),
+        "p50_ms": float(np.percentile(a, 50)),
+        "p90_ms": float(np.percentile(a, 90)),
+        "p99_ms": float(np.percentile(a, 99)),
+        "max_ms": float(a.max()),
+    }
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_size(size: int, workdir: str, backend: str, encoder: str, n_queries: int, batch_size: int, seed: int) -> Dict[str, Any]:
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.chdir(workdir)
+    from ..indexer import index, CATALOG_PATH
+    from ..recommender import Recommender
+
+    out: Dict[str, Any] = {"size": size}
+    t0 = time.perf_counter()
+    write_catalog(CATALOG_PATH, size, seed)
+    out["generate_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index(backend=backend, encoder=encoder)
+    dt = time.perf_counter() - t0
+    out["index"] = {"seconds": dt, "docs_per_sec": size / dt if dt else 0.0}
+    out["rss_after_index_mb"] = peak_rss_mb()
+
+    t0 = time.perf_counter()
+    rec = Recommender(backend=backend, encoder=encoder)
+    t1 = time.perf_counter()
+    rec.get_model()
+    t2 = time.perf_counter()
+    out["cold_start"] = {"index_load_s": t1 - t0, "ready_s": t2 - t0}
+
+    queries = make_queries(n_queries, seed + 1)
+    single = []
+    for q in queries:
+        rec.result_cache.clear()
+        rec.embed_cache.clear()
+        t0 = time.perf_counter()
+        rec.recommend(q, k=10)
+        single.append(time.perf_counter() - t0)
+    out["single"] = latency_stats(single)
+
+    batched = []
+    total = 0.0
+    for i in range(0, len(queries), batch_size):
+        rec.result_cache.clear()
+        rec.embed_cache.clear()
+        t0 = time.perf_counter()
+        rec.recommend_many(queries[i : i + batch_size], k=10)
+        dt = time.perf_counter() - t0
+        batched.append(dt)
+        total += dt
+    out["batched"] = latency_stats(batched)
+    out["batched"]["batch_size"] = batch_size
+    out["batched"]["queries_per_sec"] = len(queries) / total if total else 0.0
+    out["peak_rss_mb"] = peak_rss_mb()
+    return out
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def run_bench(
+    sizes: Optional[List[int]] = None,
+    backend: str = "numpy",
+    encoder: str = "hash",
+    n_queries: int = 200,
+    batch_size: int = 32,
+    seed: int = 0,
+    output: Optional[str] = None,
+) -> Dict[str, Any]:
+    sizes = sizes or SIZES
+    result = {
+        "started": now_iso(),
+        "env": environment(),
+        "config": {"sizes": sizes, "backend": backend, "encoder": encoder, "queries": n_queries, "batch_size": batch_size, "seed": seed},
+        "runs": [],
+    }
+    root = tempfile.mkdtemp(prefix="shl-bench-")
+    try:
+        for size in sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as ex:
+                wd = os.path.join(root, str(size))
+                result["runs"].append(ex.submit(run_size, size, wd, backend, encoder, n_queries, batch_size, seed).result())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    result["finished"] = now_iso()
+    if output is None:
+        output = os.path.join(RESULTS_DIR, "bench-%s.json" % result["started"].replace(":", ""))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    result["output"] = output
+    return result
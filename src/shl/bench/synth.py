@@ -0,0 +1,73 @@
+import random
+from typing import List
+from ..catalog_schema import Assessment, canonical_id, content_hash, write_jsonl
+
+
+SKILLS = (
+    "java python sql javascript react angular spring docker kubernetes aws azure excel accounting finance "
+    "sales marketing leadership management communication teamwork negotiation customer service support "
+    "numerical verbal reasoning inductive deductive personality motivation safety clerical typing data "
+    "entry analysis testing agile scrum linux networking security banking retail call center healthcare"
+).split()
+FILLER = (
+    "the a and of to in for with on is are be will this that our you we as an by at from or role team "
+    "candidate position responsibilities requirements experience years strong ability work environment"
+).split()
+TYPES = ["K", "K", "K", "P", "P", "A", "B", "C", "S"]
+LANGS = ["English (USA)", "English (USA), French", "English (USA), German, Spanish", "French", "German", "Spanish"]
+
+
+def vocab(rng: random.Random, size: int = 5000) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return SKILLS + ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+
+def zipf_words(rng: random.Random, words: List[str], n: int) -> List[str]:
+    m = len(words)
+    return [words[min(m - 1, int(rng.paretovariate(1.1)) - 1)] for _ in range(n)]
+
+
+def make_catalog(n: int, seed: int = 0) -> List[Assessment]:
+    rng = random.Random(seed)
+    attrs = random.Random(seed + 7)
+    words = vocab(rng)
+    rng.shuffle(words)
+    items = []
+    for i in range(n):
+        url = "https://example.com/assessments/%d" % i
+        a = Assessment(
+            id=canonical_id(url),
+            name=" ".join(rng.sample(SKILLS, rng.randint(1, 3))).title() + " (%d)" % (i % 97),
+            url=url,
+            type=rng.choice(TYPES),
+            description=" ".join(zipf_words(rng, words, rng.randint(20, 60))),
+            skills=rng.sample(SKILLS, rng.randint(3, 8)),
+            tags=[],
+            language=rng.choice(LANGS),
+            scraped_at="",
+            duration=attrs.choice([0, 10, 15, 20, 30, 45, 60, 90]),
+            remote=attrs.random() < 0.7,
+            adaptive=attrs.random() < 0.2,
+        )
+        a.content_hash = content_hash(a)
+        items.append(a)
+    return items
+
+
+def make_queries(n: int, seed: int = 1, long_ratio: float = 0.25) -> List[str]:
+    rng = random.Random(seed)
+    words = vocab(rng)
+    out = []
+    for _ in range(n):
+        if rng.random() < long_ratio:
+            parts = []
+            while sum(len(p) + 1 for p in parts) < 4800:
+                parts.append(rng.choice(FILLER + SKILLS + words[:500]))
+            out.append(" ".join(parts)[:5000])
+        else:
+            out.append(" ".join(rng.sample(SKILLS, rng.randint(2, 6)) + zipf_words(rng, FILLER, rng.randint(0, 4))))
+    return out
+
+
+def write_catalog(path: str, n: int, seed: int = 0) -> None:
+    write_jsonl(path, make_catalog(n, seed))
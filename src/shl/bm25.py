@@ -0,0 +1,130 @@
+import math
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+from .strtab import save_strings, load_array, StringTable
+
+
+def tokenize(t: str) -> List[str]:
+    return [x.lower() for x in t.split() if x.strip()]
+
+
+class InvertedBM25:
+    def __init__(self, corpus: List[List[str]], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.n_docs = len(corpus)
+        self.doc_len = np.array([len(d) for d in corpus], dtype=np.float64)
+        self.avgdl = float(self.doc_len.sum()) / self.n_docs if self.n_docs else 0.0
+        self.vocab: Dict[str, int] = {}
+        docs: List[List[int]] = []
+        tfs: List[List[int]] = []
+        for di, doc in enumerate(corpus):
+            freqs: Dict[str, int] = {}
+            for w in doc:
+                freqs[w] = freqs.get(w, 0) + 1
+            for w, c in freqs.items():
+                ti = self.vocab.get(w)
+                if ti is None:
+                    ti = self.vocab[w] = len(docs)
+                    docs.append([])
+                    tfs.append([])
+                docs[ti].append(di)
+                tfs[ti].append(c)
+        self.idf = self.calc_idf([len(d) for d in docs])
+        self.indptr = np.zeros(len(docs) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(d) for d in docs])
+        self.indices = np.array([i for d in docs for i in d], dtype=np.int32)
+        tf = np.array([c for t in tfs for c in t], dtype=np.float64)
+        idf = np.repeat(self.idf, np.diff(self.indptr))
+        norm = k1 * (1 - b + b * self.doc_len[self.indices] / (self.avgdl or 1.0))
+        self.weights = idf * (tf * (k1 + 1) / (tf + norm))
+
+    @classmethod
+    def from_arrays(cls, terms: List[str], indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray, n_docs: int) -> "InvertedBM25":
+        self = cls.__new__(cls)
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.n_docs = n_docs
+        return self
+
+    def save(self, prefix: str) -> None:
+        terms = [""] * len(self.vocab)
+        for t, i in self.vocab.items():
+            terms[i] = t
+        save_strings(prefix + ".terms", terms)
+        np.save(prefix + ".indptr.npy", self.indptr)
+        np.save(prefix + ".indices.npy", self.indices)
+        np.save(prefix + ".weights.npy", self.weights)
+
+    @classmethod
+    def load(cls, prefix: str, n_docs: int) -> "InvertedBM25":
+        return cls.from_arrays(
+            StringTable(prefix + ".terms").tolist(),
+            load_array(prefix + ".indptr.npy"),
+            load_array(prefix + ".indices.npy"),
+            load_array(prefix + ".weights.npy"),
+            n_docs,
+        )
+
+    def calc_idf(self, df: List[int]) -> np.ndarray:
+        idf = np.zeros(len(df), dtype=np.float64)
+        idf_sum = 0
+        negative = []
+        for i, freq in enumerate(df):
+            v = math.log(self.n_docs - freq + 0.5) - math.log(freq + 0.5)
+            idf[i] = v
+            idf_sum += v
+            if v < 0:
+                negative.append(i)
+        if df:
+            eps = self.epsilon * (idf_sum / len(df))
+            idf[negative] = eps
+        return idf
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        ti = self.vocab.get(term)
+        if ti is None:
+            return self.indices[:0], self.weights[:0]
+        lo, hi = self.indptr[ti], self.indptr[ti + 1]
+        return self.indices[lo:hi], self.weights[lo:hi]
+
+    def accumulate(self, scores: np.ndarray, query: List[str]) -> np.ndarray:
+        touched = []
+        for q in query:
+            docs, w = self.postings(q)
+            if len(docs):
+                scores[docs] += w
+                touched.append(docs)
+        return np.unique(np.concatenate(touched)) if touched else self.indices[:0]
+
+    def score_docs(self, query: List[str], docs: np.ndarray) -> np.ndarray:
+        scores = np.zeros(len(docs), dtype=np.float64)
+        for q in query:
+            pdocs, w = self.postings(q)
+            if not len(pdocs):
+                continue
+            pos = np.searchsorted(pdocs, docs)
+            pos[pos >= len(pdocs)] = 0
+            hit = pdocs[pos] == docs
+            scores[hit] += w[pos[hit]]
+        return scores
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        scores = np.zeros(self.n_docs, dtype=np.float64)
+        self.accumulate(scores, query)
+        return scores
+
+    def top(self, query: List[str], k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.zeros(self.n_docs, dtype=np.float64)
+        docs = self.accumulate(scores, query)
+        if mask is not None:
+            docs = docs[mask[docs]]
+        vals = scores[docs]
+        if k < len(docs):
+            part = np.argpartition(-vals, k - 1)[:k]
+            docs, vals = docs[part], vals[part]
+        order = np.argsort(-vals, kind="stable")
+        return docs[order], vals[order]
@@ -0,0 +1,177 @@
+import os
+import csv
+import json
+import time
+import itertools
+from typing import List, Dict, Any, Iterator, Optional
+from .artifacts import catalog_signature
+from .recommender import Recommender
+
+
+BULK_CHUNK = int(os.getenv("SHL_BULK_CHUNK", "256"))
+QUERY_KEYS = ("query", "text", "jd")
+
+
+def pick_column(header: List[Any]) -> int:
+    names = [str(h or "").strip().lower() for h in header]
+    for i, n in enumerate(names):
+        if "query" in n:
+            return i
+    return 0
+
+
+def iter_ndjson(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                obj = line
+            if isinstance(obj, dict):
+                obj = next((obj[k] for k in QUERY_KEYS if obj.get(k)), "")
+            yield str(obj)
+
+
+def iter_csv(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        col = pick_column(header)
+        for row in reader:
+            if col < len(row):
+                yield row[col]
+
+
+def iter_xlsx(path: str) -> Iterator[str]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb[next((s for s in wb.sheetnames if "test" in s.lower()), wb.sheetnames[0])]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        col = pick_column(list(header))
+        for row in rows:
+            if col < len(row) and row[col] is not None:
+                yield str(row[col])
+    finally:
+        wb.close()
+
+
+def iter_text(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line
+
+
+READERS = {".ndjson": iter_ndjson, ".jsonl": iter_ndjson, ".csv": iter_csv, ".xlsx": iter_xlsx, ".txt": iter_text}
+
+
+def iter_queries(path: str) -> Iterator[str]:
+    reader = READERS.get(os.path.splitext(path)[1].lower(), iter_text)
+    for q in reader(path):
+        q = q.strip()
+        if q:
+            yield q
+
+
+def chunked(it: Iterator[str], n: int) -> Iterator[List[str]]:
+    while True:
+        chunk = list(itertools.islice(it, n))
+        if not chunk:
+            return
+        yield chunk
+
+
+def checkpoint_path(output: str) -> str:
+    return output + ".ckpt.json"
+
+
+def load_checkpoint(input_path: str, output: str, k: int) -> Dict[str, Any]:
+    path = checkpoint_path(output)
+    if not os.path.exists(path) or not os.path.exists(output):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+    except Exception:
+        return {}
+    if ckpt.get("input") != os.path.abspath(input_path) or ckpt.get("signature") != catalog_signature(input_path):
+        return {}
+    if ckpt.get("k") != k or os.path.getsize(output) < ckpt.get("bytes", 0):
+        return {}
+    return ckpt
+
+
+def save_checkpoint(output: str, ckpt: Dict[str, Any]) -> None:
+    path = checkpoint_path(output)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, path)
+
+
+def write_rows(f, fmt: str, start: int, queries: List[str], results: List[List[Dict[str, Any]]]) -> None:
+    if fmt == "csv":
+        w = csv.writer(f)
+        for q, items in zip(queries, results):
+            for it in items:
+                w.writerow([q, it["url"]])
+    else:
+        for i, (q, items) in enumerate(zip(queries, results)):
+            f.write(json.dumps({"row": start + i, "query": q, "items": items}, ensure_ascii=False) + "\n")
+
+
+def bulk_predict(
+    input_path: str,
+    output: str,
+    k: int = 10,
+    chunk: int = BULK_CHUNK,
+    rec: Optional[Recommender] = None,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    fmt = "csv" if output.lower().endswith(".csv") else "ndjson"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    ckpt = load_checkpoint(input_path, output, k)
+    start = ckpt.get("done", 0)
+    rec = rec or Recommender()
+    if ckpt:
+        os.truncate(output, ckpt["bytes"])
+    with open(output, "a" if ckpt else "w", encoding="utf-8", newline="") as f:
+        if not ckpt and fmt == "csv":
+            csv.writer(f).writerow(["Query", "Assessment_URL"])
+        done = start
+        qs = iter_queries(input_path)
+        for queries in chunked(itertools.islice(qs, start, None), max(1, chunk)):
+            write_rows(f, fmt, done, queries, rec.recommend_many(queries, k=k))
+            f.flush()
+            os.fsync(f.fileno())
+            done += len(queries)
+            save_checkpoint(
+                output,
+                {
+                    "input": os.path.abspath(input_path),
+                    "signature": catalog_signature(input_path),
+                    "k": k,
+                    "done": done,
+                    "bytes": os.fstat(f.fileno()).st_size,
+                },
+            )
+    try:
+        os.remove(checkpoint_path(output))
+    except FileNotFoundError:
+        pass
+    return {
+        "input": input_path,
+        "output": output,
+        "queries": done,
+        "resumed_from": start,
+        "seconds": time.perf_counter() - t0,
+    }
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 import hashlib
 import json
+import os
 import datetime
 
 
@@ -21,6 +22,10 @@ class Assessment:
     tags: List[str]
     language: str
     scraped_at: str
+    content_hash: str = ""
+    duration: int = 0
+    remote: bool = False
+    adaptive: bool = False
 
     @staticmethod
     def from_dict(d: Dict[str, Any]) -> "Assessment":
@@ -34,6 +39,10 @@ class Assessment:
             tags=d.get("tags", []) or [],
             language=d.get("language", "en"),
             scraped_at=d.get("scraped_at", ""),
+            content_hash=d.get("content_hash", ""),
+            duration=int(d.get("duration", 0) or 0),
+            remote=bool(d.get("remote", False)),
+            adaptive=bool(d.get("adaptive", False)),
         )
 
     def to_json(self) -> str:
@@ -48,6 +57,10 @@ class Assessment:
                 "tags": self.tags,
                 "language": self.language,
                 "scraped_at": self.scraped_at,
+                "content_hash": self.content_hash,
+                "duration": self.duration,
+                "remote": self.remote,
+                "adaptive": self.adaptive,
             },
             ensure_ascii=False,
         )
@@ -56,3 +69,40 @@ class Assessment:
 def now_iso() -> str:
     return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
 
+
+
+def build_text(a: Assessment) -> str:
+    parts = [
+        a.name,
+        a.description,
+        "skills: " + ", ".join(a.skills),
+        "tags: " + ", ".join(a.tags),
+        "type: " + a.type,
+    ]
+    return " | ".join([p for p in parts if p])
+
+
+def content_hash(a: Assessment) -> str:
+    return hashlib.sha1(build_text(a).encode("utf-8")).hexdigest()
+
+
+def read_jsonl(path: str) -> List[Assessment]:
+    items = []
+    if not os.path.exists(path):
+        return items
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            d = json.loads(line)
+            items.append(Assessment.from_dict(d))
+    return items
+
+
+def write_jsonl(path: str, items: List[Assessment]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for it in items:
+            f.write(it.to_json() + "\n")
+    os.replace(tmp, path)
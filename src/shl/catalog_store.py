@@ -0,0 +1,125 @@
+import os
+import json
+import shutil
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+import numpy as np
+from .artifacts import catalog_signature
+from .catalog_schema import Assessment
+from .strtab import save_strings, load_array, StringTable
+
+
+CATALOG_STORE_DIR = "data/catalog_store"
+STR_FIELDS = ["id", "name", "url", "type", "description", "language", "scraped_at", "content_hash"]
+LIST_FIELDS = ["skills", "tags"]
+NUM_FIELDS = {"duration": np.int32, "remote": np.bool_, "adaptive": np.bool_}
+FIELDS = STR_FIELDS + LIST_FIELDS + list(NUM_FIELDS)
+SEP = "\x1f"
+STORE_VERSION = 2
+
+
+class AssessmentView:
+    __slots__ = ("store", "i")
+
+    def __init__(self, store: "CatalogStore", i: int):
+        self.store = store
+        self.i = i
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in self.store.columns:
+            raise AttributeError(name)
+        v = self.store.columns[name][self.i]
+        if name in LIST_FIELDS:
+            return v.split(SEP) if v else []
+        if name in NUM_FIELDS:
+            return v.item()
+        return v
+
+    def __repr__(self) -> str:
+        return "AssessmentView(%d, %r)" % (self.i, self.store.columns["name"][self.i])
+
+
+class CatalogStore:
+    def __init__(self, path: str = CATALOG_STORE_DIR):
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as fh:
+            self.manifest = json.load(fh)
+        self.path = path
+        self.columns: Dict[str, Any] = {f: StringTable(os.path.join(path, f)) for f in STR_FIELDS + LIST_FIELDS}
+        for f in NUM_FIELDS:
+            self.columns[f] = load_array(os.path.join(path, f + ".npy"))
+
+    def __len__(self) -> int:
+        return self.manifest["n_docs"]
+
+    def __getitem__(self, i: int) -> AssessmentView:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return AssessmentView(self, i)
+
+    def __iter__(self) -> Iterator[AssessmentView]:
+        for i in range(len(self)):
+            yield AssessmentView(self, i)
+
+
+def write_store(rows: Iterable[Dict[str, Any]], catalog_path: str, path: str = CATALOG_STORE_DIR) -> int:
+    cols: Dict[str, List[Any]] = {f: [] for f in FIELDS}
+    for d in rows:
+        for f in STR_FIELDS:
+            cols[f].append(str(d.get(f, "") or ""))
+        for f in LIST_FIELDS:
+            cols[f].append(SEP.join(d.get(f, []) or []))
+        for f in NUM_FIELDS:
+            cols[f].append(d.get(f) or 0)
+    tmp = path + ".tmp"
+    old = path + ".old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for f in STR_FIELDS + LIST_FIELDS:
+        save_strings(os.path.join(tmp, f), cols[f])
+    for f, dt in NUM_FIELDS.items():
+        np.save(os.path.join(tmp, f + ".npy"), np.array(cols[f], dtype=dt))
+    n = len(cols["id"])
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump({"version": STORE_VERSION, "n_docs": n, "catalog": catalog_signature(catalog_path)}, fh)
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return n
+
+
+def iter_jsonl_dicts(catalog_path: str) -> Iterator[Dict[str, Any]]:
+    with open(catalog_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield Assessment.from_dict(json.loads(line)).__dict__
+
+
+def convert(catalog_path: str, path: str = CATALOG_STORE_DIR) -> Dict[str, Any]:
+    n = write_store(iter_jsonl_dicts(catalog_path), catalog_path, path)
+    return {"catalog": catalog_path, "store": path, "n_docs": n}
+
+
+def store_fresh(catalog_path: str, path: str = CATALOG_STORE_DIR) -> bool:
+    mpath = os.path.join(path, "manifest.json")
+    if not os.path.exists(mpath):
+        return False
+    with open(mpath, "r", encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("version") != STORE_VERSION:
+        return False
+    return not os.path.exists(catalog_path) or manifest.get("catalog") == catalog_signature(catalog_path)
+
+
+def open_catalog(catalog_path: str, path: str = CATALOG_STORE_DIR) -> Optional[CatalogStore]:
+    if not store_fresh(catalog_path, path):
+        if not os.path.exists(catalog_path):
+            return None
+        try:
+            convert(catalog_path, path)
+        except OSError:
+            return None
+    return CatalogStore(path)
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from typing import List, Dict, Any, Callable, Optional
+import numpy as np
+from .encoder import MODEL_NAME, encoder_name
+from .strtab import load_array
+
+
+EMB_CACHE_DIR = os.path.join("data", "emb_cache")
+EMB_CACHE_MAX = int(os.getenv("SHL_EMB_CACHE_MAX", "1000000"))
+EMB_CACHE_TTL_DAYS = float(os.getenv("SHL_EMB_CACHE_TTL_DAYS", "30"))
+EMB_CACHE_SPILL = int(os.getenv("SHL_EMB_CACHE_SPILL", "16384"))
+COPY_CHUNK = 8192
+KEY_DTYPE = "S20"
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, encoder: Optional[str] = None, path: str = EMB_CACHE_DIR):
+        self.model = "%s:%s" % (MODEL_NAME, encoder_name(encoder))
+        self.path = os.path.join(path, hashlib.sha1(self.model.encode("utf-8")).hexdigest()[:16])
+        self.keys = np.zeros(0, dtype=KEY_DTYPE)
+        self.vecs: Optional[np.ndarray] = None
+        self.used = np.zeros(0, dtype=np.int64)
+        self.pending: Dict[bytes, np.ndarray] = {}
+        self.touched: List[np.ndarray] = []
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(os.path.join(self.path, "meta.json")):
+            self.keys = load_array(os.path.join(self.path, "keys.npy"))
+            self.vecs = load_array(os.path.join(self.path, "vecs.npy"))
+            self.used = np.load(os.path.join(self.path, "used.npy"))
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.pending)
+
+    def lookup(self, keys: List[bytes]) -> np.ndarray:
+        if not len(self.keys) or not keys:
+            return np.full(len(keys), -1, dtype=np.int64)
+        q = np.array(keys, dtype=KEY_DTYPE)
+        pos = np.searchsorted(self.keys, q)
+        pos[pos >= len(self.keys)] = 0
+        return np.where(self.keys[pos] == q, pos, -1)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        keys = [text_key(t) for t in texts]
+        idx = self.lookup(keys)
+        found = idx[idx >= 0]
+        if len(found):
+            self.touched.append(found)
+        out = []
+        for k, i in zip(keys, idx):
+            v = self.vecs[i] if i >= 0 else self.pending.get(k)
+            out.append(None if v is None else np.array(v, dtype=np.float32))
+        n_hit = sum(1 for v in out if v is not None)
+        self.hits += n_hit
+        self.misses += len(out) - n_hit
+        return out
+
+    def put_many(self, texts: List[str], vecs: np.ndarray) -> None:
+        for t, v in zip(texts, vecs):
+            self.pending[text_key(t)] = np.asarray(v, dtype=np.float32)
+        if len(self.pending) >= EMB_CACHE_SPILL:
+            self.flush()
+
+    def flush(self) -> None:
+        now = int(time.time())
+        used = np.array(self.used, dtype=np.int64)
+        if self.touched:
+            used[np.concatenate(self.touched)] = now
+            self.touched = []
+        keep = np.flatnonzero(used >= now - int(EMB_CACHE_TTL_DAYS * 86400))
+        room = max(0, EMB_CACHE_MAX - len(self.pending))
+        if len(keep) > room:
+            keep = np.sort(keep[np.argsort(-used[keep], kind="stable")[:room]])
+        if not self.pending and len(keep) == len(used):
+            if len(used):
+                tmp = os.path.join(self.path, "used.tmp.npy")
+                np.save(tmp, used)
+                os.replace(tmp, os.path.join(self.path, "used.npy"))
+            self.used = used
+            return
+        new_keys = np.array(list(self.pending), dtype=KEY_DTYPE)
+        new_vecs = np.vstack(list(self.pending.values())) if self.pending else None
+        if new_vecs is not None:
+            dim = new_vecs.shape[1]
+        else:
+            dim = self.vecs.shape[1] if self.vecs is not None and self.vecs.ndim == 2 else 0
+        keys = np.concatenate([self.keys[keep], new_keys])
+        used = np.concatenate([used[keep], np.full(len(new_keys), now, dtype=np.int64)])
+        order = np.argsort(keys, kind="stable")
+
+        def rows(lo: int, hi: int) -> np.ndarray:
+            sel = order[lo:hi]
+            old = sel < len(keep)
+            out = np.empty((len(sel), dim), dtype=np.float32)
+            if old.any():
+                out[old] = self.vecs[keep[sel[old]]]
+            if not old.all():
+                out[~old] = new_vecs[sel[~old] - len(keep)]
+            return out
+
+        self.write(keys[order], used[order], dim, rows)
+        self.pending = {}
+
+    def write(self, keys: np.ndarray, used: np.ndarray, dim: int, rows: Callable[[int, int], np.ndarray]) -> None:
+        tmp = self.path + ".tmp"
+        old = self.path + ".old"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "keys.npy"), keys)
+        if len(keys) and dim:
+            vecs = np.lib.format.open_memmap(os.path.join(tmp, "vecs.npy"), mode="w+", dtype=np.float32, shape=(len(keys), dim))
+            for lo in range(0, len(keys), COPY_CHUNK):
+                vecs[lo : lo + COPY_CHUNK] = rows(lo, min(lo + COPY_CHUNK, len(keys)))
+            vecs.flush()
+            del vecs
+        else:
+            np.save(os.path.join(tmp, "vecs.npy"), np.zeros((len(keys), dim), dtype=np.float32))
+        np.save(os.path.join(tmp, "used.npy"), used)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump({"model": self.model, "count": len(keys), "dim": dim}, fh)
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old)
+        os.replace(tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        self.keys = load_array(os.path.join(self.path, "keys.npy"))
+        self.vecs = load_array(os.path.join(self.path, "vecs.npy"))
+        self.used = used
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "model": self.model,
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def encode_cached(
+    texts: List[str], cache: EmbeddingCache, loader: Callable[[], Any], batch_size: int = 64
+) -> np.ndarray:
+    rows = cache.get_many(texts)
+    miss = list(dict.fromkeys(t for t, row in zip(texts, rows) if row is None))
+    if miss:
+        embs = loader().encode(miss, normalize_embeddings=True, batch_size=batch_size, show_progress_bar=False)
+        embs = np.asarray(embs, dtype=np.float32)
+        cache.put_many(miss, embs)
+        fresh = dict(zip(miss, embs))
+        rows = [row if row is not None else fresh[t] for t, row in zip(texts, rows)]
+    cache.flush()
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(rows)
@@ -0,0 +1,65 @@
+import os
+import zlib
+from typing import List, Optional
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODER_BACKEND = os.getenv("SHL_ENCODER_BACKEND", "torch")
+ONNX_FILES = {
+    "onnx": os.getenv("SHL_ONNX_FILE", "onnx/model.onnx"),
+    "onnx-int8": os.getenv("SHL_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx"),
+}
+
+
+class HashEncoder:
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                h = zlib.crc32(w.encode("utf-8"))
+                out[i, h % self.dim] += 1.0 if h & 0x10000 else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            out /= norms
+        return out
+
+
+def load_torch():
+    return SentenceTransformer(MODEL_NAME)
+
+
+def load_int8():
+    import torch
+
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_onnx(name: str):
+    return SentenceTransformer(MODEL_NAME, device="cpu", backend="onnx", model_kwargs={"file_name": ONNX_FILES[name]})
+
+
+BACKENDS = {
+    "torch": load_torch,
+    "int8": load_int8,
+    "onnx": lambda: load_onnx("onnx"),
+    "onnx-int8": lambda: load_onnx("onnx-int8"),
+    "hash": HashEncoder,
+}
+
+
+def encoder_name(backend: Optional[str] = None) -> str:
+    name = backend or ENCODER_BACKEND
+    if name not in BACKENDS:
+        raise ValueError("unknown encoder backend: " + name)
+    return name
+
+
+def load_encoder(backend: Optional[str] = None):
+    return BACKENDS[encoder_name(backend)]()
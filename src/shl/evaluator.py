@@ -1,10 +1,21 @@
 import os
+import json
+import time
+import shutil
+import tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from .artifacts import catalog_signature
+from .embcache import EMB_CACHE_DIR
+from .indexer import index, CATALOG_PATH
 from .recommender import Recommender
+from .strtab import save_strings, StringTable
 
 
 DATASET_PATH = "Gen_AI Dataset.xlsx"
+DATASET_CACHE_DIR = "data/eval_cache"
 OUTPUT_DIR = "outputs"
 
 
@@ -12,8 +23,7 @@ def ensure_dirs():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-def read_train() -> List[Dict[str, Any]]:
-    xls = pd.ExcelFile(DATASET_PATH)
+def parse_train(xls: pd.ExcelFile) -> List[Dict[str, Any]]:
     sn = None
     for s in xls.sheet_names:
         if "train" in s.lower():
@@ -42,8 +52,7 @@ def read_train() -> List[Dict[str, Any]]:
     return rows
 
 
-def read_test() -> List[str]:
-    xls = pd.ExcelFile(DATASET_PATH)
+def parse_test(xls: pd.ExcelFile) -> List[str]:
     sn = None
     for s in xls.sheet_names:
         if "test" in s.lower():
@@ -64,6 +73,46 @@ def read_test() -> List[str]:
     return qs
 
 
+def save_dataset(train: List[Dict[str, Any]], test: List[str], path: str = DATASET_CACHE_DIR) -> None:
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    save_strings(os.path.join(tmp, "train_query"), [r["query"] for r in train])
+    save_strings(os.path.join(tmp, "train_gt"), ["\n".join(r["ground_truth"]) for r in train])
+    save_strings(os.path.join(tmp, "test_query"), test)
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump({"dataset": catalog_signature(DATASET_PATH)}, fh)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def load_dataset(path: str = DATASET_CACHE_DIR) -> Dict[str, Any]:
+    mpath = os.path.join(path, "manifest.json")
+    if os.path.exists(mpath):
+        with open(mpath, "r", encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        if manifest.get("dataset") == catalog_signature(DATASET_PATH):
+            qs = StringTable(os.path.join(path, "train_query")).tolist()
+            gts = StringTable(os.path.join(path, "train_gt")).tolist()
+            train = [{"query": q, "ground_truth": [x for x in g.split("\n") if x]} for q, g in zip(qs, gts)]
+            return {"train": train, "test": StringTable(os.path.join(path, "test_query")).tolist()}
+    xls = pd.ExcelFile(DATASET_PATH)
+    data = {"train": parse_train(xls), "test": parse_test(xls)}
+    try:
+        save_dataset(data["train"], data["test"], path)
+    except OSError:
+        pass
+    return data
+
+
+def read_train() -> List[Dict[str, Any]]:
+    return load_dataset()["train"]
+
+
+def read_test() -> List[str]:
+    return load_dataset()["test"]
+
+
 def recall_at_10(pred: List[str], gt: List[str]) -> float:
     if not gt:
         return 0.0
@@ -73,33 +122,72 @@ def recall_at_10(pred: List[str], gt: List[str]) -> float:
     return float(len(inter)) / float(len(s_gt))
 
 
-def evaluate() -> Dict[str, Any]:
+def evaluate(encoder: Optional[str] = None, backend: Optional[str] = None) -> Dict[str, Any]:
     ensure_dirs()
-    rec = Recommender()
+    rec = Recommender(backend=backend, encoder=encoder, persist_embeddings=True)
     train = read_train()
     rows = []
     vals = []
-    for row in train:
+    results = rec.recommend_many([row["query"] for row in train], k=10)
+    for row, items in zip(train, results):
         q = row["query"]
         gt = row["ground_truth"]
-        items = rec.recommend(q, k=10)
         pred = [it["url"] for it in items]
         r = recall_at_10(pred, gt)
         rows.append({"query": q, "recall_at_10": r})
         vals.append(r)
     m = sum(vals) / len(vals) if vals else 0.0
     df = pd.DataFrame(rows)
-    df.to_csv(os.path.join(OUTPUT_DIR, "train_recall.csv"), index=False)
+    name = "train_recall.csv" if encoder is None else "train_recall_%s.csv" % encoder
+    df.to_csv(os.path.join(OUTPUT_DIR, name), index=False)
     return {"mean_recall_at_10": m, "count": len(vals)}
 
 
+def parity_run(encoder: str, workdir: str, root: str) -> Dict[str, Any]:
+    os.makedirs(os.path.join(workdir, "data"))
+    for name in (DATASET_PATH, OUTPUT_DIR, DATASET_CACHE_DIR, EMB_CACHE_DIR, CATALOG_PATH):
+        if os.path.exists(os.path.join(root, name)):
+            os.symlink(os.path.join(root, name), os.path.join(workdir, name))
+    os.chdir(workdir)
+    t0 = time.perf_counter()
+    index(backend="numpy", encoder=encoder)
+    t1 = time.perf_counter()
+    r = evaluate(encoder=encoder, backend="numpy")
+    r["index_seconds"] = t1 - t0
+    r["seconds"] = time.perf_counter() - t1
+    return r
+
+
+def parity(encoders: List[str], tolerance: float = 0.01) -> Dict[str, Any]:
+    ensure_dirs()
+    read_train()
+    os.makedirs(EMB_CACHE_DIR, exist_ok=True)
+    root = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="shl-parity-")
+    results = {}
+    try:
+        for i, enc in enumerate(encoders):
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as ex:
+                results[enc] = ex.submit(parity_run, enc, os.path.join(tmp, str(i)), root).result()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    base = results[encoders[0]]["mean_recall_at_10"]
+    drops = {enc: base - r["mean_recall_at_10"] for enc, r in results.items()}
+    return {
+        "reference": encoders[0],
+        "results": results,
+        "recall_drop": drops,
+        "ok": all(d <= tolerance for d in drops.values()),
+    }
+
+
 def predict_test() -> str:
     ensure_dirs()
-    rec = Recommender()
+    rec = Recommender(persist_embeddings=True)
     tests = read_test()
     out_rows = []
-    for q in tests:
-        items = rec.recommend(q, k=10)
+    results = rec.recommend_many(tests, k=10)
+    for q, items in zip(tests, results):
         for it in items:
             out_rows.append({"Query": q, "Assessment_URL": it["url"]})
     df = pd.DataFrame(out_rows)
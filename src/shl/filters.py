@@ -0,0 +1,149 @@
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+
+BITMAP_FIELDS = ["type", "language", "remote", "adaptive"]
+FILTER_KEYS = ["type", "language", "remote", "adaptive", "min_duration", "max_duration"]
+
+
+def split_values(v: Any) -> List[str]:
+    if isinstance(v, bool):
+        return ["1" if v else "0"]
+    if isinstance(v, (list, tuple, set)):
+        vals = [str(x) for x in v]
+    else:
+        vals = str(v or "").split(",")
+    return sorted(set(x.strip().lower() for x in vals if x.strip()))
+
+
+def parse_bool(v: Any) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in {"1", "true", "yes", "y"}
+    return bool(v)
+
+
+def normalize_filters(filters: Any) -> Tuple[Tuple[str, Any], ...]:
+    if not filters:
+        return ()
+    out = []
+    for key, v in filters.items() if isinstance(filters, dict) else filters:
+        if key not in FILTER_KEYS:
+            raise ValueError("unknown filter: " + key)
+        if v is None or v == "" or v == []:
+            continue
+        if key in ("min_duration", "max_duration"):
+            out.append((key, int(v)))
+        elif key in ("remote", "adaptive"):
+            out.append((key, parse_bool(v)))
+        else:
+            vals = split_values(v)
+            if vals:
+                out.append((key, tuple(vals)))
+    return tuple(sorted(out))
+
+
+def doc_values(field: str, v: Any) -> List[str]:
+    if field in ("remote", "adaptive"):
+        return ["1" if v else "0"]
+    return split_values(v)
+
+
+class FilterIndex:
+    def __init__(self, n_docs: int, bitmaps: Dict[str, Dict[str, np.ndarray]], duration: np.ndarray):
+        self.n_docs = n_docs
+        self.bitmaps = bitmaps
+        self.duration = duration
+        self.empty = np.zeros((n_docs + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def build(cls, items: List[Any]) -> "FilterIndex":
+        n = len(items)
+        bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        for field in BITMAP_FIELDS:
+            rows: Dict[str, List[int]] = {}
+            for i, a in enumerate(items):
+                for v in doc_values(field, getattr(a, field, "")):
+                    rows.setdefault(v, []).append(i)
+            bits = {}
+            for v, idx in rows.items():
+                mask = np.zeros(n, dtype=bool)
+                mask[idx] = True
+                bits[v] = np.packbits(mask)
+            bitmaps[field] = bits
+        duration = np.array([int(getattr(a, "duration", 0) or 0) for a in items], dtype=np.int32)
+        return cls(n, bitmaps, duration)
+
+    def save(self, path: str) -> None:
+        arrays = {"duration": self.duration}
+        for field, bits in self.bitmaps.items():
+            for v, b in bits.items():
+                arrays["%s=%s" % (field, v)] = b
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str, n_docs: int) -> "FilterIndex":
+        bitmaps: Dict[str, Dict[str, np.ndarray]] = {f: {} for f in BITMAP_FIELDS}
+        with np.load(path) as z:
+            duration = z["duration"]
+            for key in z.files:
+                if "=" in key:
+                    field, v = key.split("=", 1)
+                    bitmaps.setdefault(field, {})[v] = z[key]
+        return cls(n_docs, bitmaps, duration)
+
+    def mask(self, filters: Tuple[Tuple[str, Any], ...]) -> Optional[np.ndarray]:
+        if not filters:
+            return None
+        packed = None
+        for key, v in filters:
+            if key in ("min_duration", "max_duration"):
+                continue
+            vals = ("1" if v else "0",) if key in ("remote", "adaptive") else v
+            field_bits = self.empty
+            bits = self.bitmaps.get(key, {})
+            for x in vals:
+                if x in bits:
+                    field_bits = field_bits | bits[x]
+            packed = field_bits if packed is None else packed & field_bits
+        mask = np.ones(self.n_docs, dtype=bool) if packed is None else np.unpackbits(packed, count=self.n_docs).astype(bool)
+        d = dict(filters)
+        if "min_duration" in d:
+            mask &= self.duration >= d["min_duration"]
+        if "max_duration" in d:
+            mask &= (self.duration > 0) & (self.duration <= d["max_duration"])
+        return mask
+
+
+def chroma_where(filters: Tuple[Tuple[str, Any], ...]) -> Optional[Dict[str, Any]]:
+    clauses = []
+    for key, v in filters:
+        if key == "type":
+            clauses.append({"type": {"$in": [x.upper() for x in v]}})
+        elif key == "language":
+            opts = [{"lang_" + x: True} for x in v]
+            clauses.append(opts[0] if len(opts) == 1 else {"$or": opts})
+        elif key in ("remote", "adaptive"):
+            clauses.append({key: v})
+        elif key == "min_duration":
+            clauses.append({"duration": {"$gte": v}})
+        elif key == "max_duration":
+            clauses.append({"duration": {"$gt": 0}})
+            clauses.append({"duration": {"$lte": v}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def chroma_metadata(a: Any) -> Dict[str, Any]:
+    meta = {
+        "name": a.name,
+        "url": a.url,
+        "type": a.type,
+        "duration": int(a.duration or 0),
+        "remote": bool(a.remote),
+        "adaptive": bool(a.adaptive),
+    }
+    for x in split_values(a.language):
+        meta["lang_" + x] = True
+    return meta
@@ -0,0 +1,237 @@
+import os
+import re
+from functools import partial
+from typing import List, Dict, Any, Tuple, Optional, Callable
+import numpy as np
+from .filters import chroma_where
+from .metrics import timed
+from .querypre import POOLING
+
+
+SEM_WEIGHT = float(os.getenv("SHL_SEM_WEIGHT", "0.7"))
+NAME_WEIGHT = float(os.getenv("SHL_NAME_WEIGHT", "0.3"))
+FUSION_METHOD = os.getenv("SHL_FUSION", "weighted")
+RETRIEVERS = os.getenv("SHL_RETRIEVERS", "dense,bm25")
+RETRIEVER_DEPTH = int(os.getenv("SHL_RETRIEVER_DEPTH", "0"))
+FUSION_METHODS = ["weighted", "rrf", "minmax", "zscore"]
+RRF_K = int(os.getenv("SHL_RRF_K", "60"))
+DENSE_MAX = 200
+NAME_TOKEN = re.compile(r"\w+")
+
+Hits = Tuple[np.ndarray, np.ndarray]
+
+
+def empty_hits() -> Hits:
+    return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+
+def sorted_hits(idx: np.ndarray, scores: np.ndarray) -> Hits:
+    order = np.lexsort((idx, -scores))
+    return idx[order], scores[order]
+
+
+class QueryBatch:
+    def __init__(
+        self,
+        texts: List[str],
+        preps: List[Tuple[List[str], List[str]]],
+        vectors: Optional[List[np.ndarray]] = None,
+        mask: Optional[np.ndarray] = None,
+        fkey: Tuple[Tuple[str, Any], ...] = (),
+    ):
+        self.texts = texts
+        self.preps = preps
+        self.vectors = vectors
+        self.mask = mask
+        self.fkey = fkey
+        self.allowed = None if mask is None else np.flatnonzero(mask)
+
+
+class DenseRetriever:
+    name = "dense"
+    norm = "none"
+
+    def __init__(self, rec: Any, weight: float = SEM_WEIGHT):
+        self.rec = rec
+        self.weight = weight
+
+    def search(self, batch: QueryBatch, m: int) -> List[List[Hits]]:
+        rec = self.rec
+        if batch.vectors is None:
+            flat = rec.embed([c for chunks, _ in batch.preps for c in chunks])
+            bounds = np.cumsum([0] + [len(chunks) for chunks, _ in batch.preps])
+            batch.vectors = [flat[bounds[i] : bounds[i + 1]] for i in range(len(batch.preps))]
+        owners = [qi for qi, g in enumerate(batch.vectors) for _ in range(len(g))]
+        qes = np.vstack(batch.vectors)
+        m = min(m, DENSE_MAX)
+        if batch.allowed is None:
+            ids, sims = rec.store.query(qes, n=m)
+        else:
+            rows = None if rec.store_rows is None else rec.store_rows[batch.allowed]
+            if rows is not None:
+                rows = rows[rows >= 0]
+            ids, sims = rec.store.query(qes, n=m, rows=rows, where=chroma_where(batch.fkey))
+        out: List[List[Hits]] = [[] for _ in batch.vectors]
+        for vi, qi in enumerate(owners):
+            pairs = [(rec.id_index[i], s) for i, s in zip(ids[vi], sims[vi]) if i in rec.id_index]
+            idx = np.array([i for i, _ in pairs], dtype=np.int64)
+            sims_q = np.array([s for _, s in pairs], dtype=np.float64)
+            if batch.mask is not None:
+                keep = batch.mask[idx]
+                idx, sims_q = idx[keep], sims_q[keep]
+            out[qi].append((idx, sims_q))
+        return out
+
+    def pool(self, chunks: List[Hits], m: int) -> Hits:
+        if not chunks:
+            return empty_hits()
+        if len(chunks) == 1:
+            idx, scores = chunks[0]
+            return idx[:m], scores[:m]
+        idx = np.concatenate([c[0][:m] for c in chunks])
+        scores = np.concatenate([c[1][:m] for c in chunks])
+        uniq, inv = np.unique(idx, return_inverse=True)
+        pooled = np.zeros(len(uniq))
+        if POOLING == "mean":
+            np.add.at(pooled, inv, scores / len(chunks))
+        else:
+            np.maximum.at(pooled, inv, scores)
+        return sorted_hits(uniq, pooled)
+
+    def retrieve(self, batch: QueryBatch, m: int) -> List[Hits]:
+        return [self.pool(chunks, m) for chunks in self.search(batch, m)]
+
+
+class BM25Retriever:
+    name = "bm25"
+    norm = "max"
+
+    def __init__(self, rec: Any, weight: float = 1.0 - SEM_WEIGHT):
+        self.rec = rec
+        self.weight = weight
+
+    def retrieve(self, batch: QueryBatch, m: int) -> List[Hits]:
+        bm25 = self.rec.bm25
+        if bm25 is None:
+            return [empty_hits() for _ in batch.preps]
+        return [bm25.top(terms, m, mask=batch.mask) for _, terms in batch.preps]
+
+    def fill(self, batch: QueryBatch, qi: int, idx: np.ndarray) -> np.ndarray:
+        return self.rec.bm25.score_docs(batch.preps[qi][1], idx)
+
+
+class NameRetriever:
+    name = "name"
+    norm = "max"
+
+    def __init__(self, rec: Any, weight: float = NAME_WEIGHT):
+        self.rec = rec
+        self.weight = weight
+        self.names: Dict[Tuple[str, ...], List[int]] = {}
+        for i, (nm, _, _) in enumerate(rec.records):
+            key = tuple(NAME_TOKEN.findall(nm.lower()))
+            if key:
+                self.names.setdefault(key, []).append(i)
+        self.max_len = max((len(k) for k in self.names), default=0)
+
+    def match(self, text: str) -> Dict[int, float]:
+        toks = NAME_TOKEN.findall(text.lower())
+        found: Dict[int, float] = {}
+        for size in range(1, min(self.max_len, len(toks)) + 1):
+            for i in range(len(toks) - size + 1):
+                for d in self.names.get(tuple(toks[i : i + size]), ()):
+                    found[d] = float(size)
+        return found
+
+    def retrieve(self, batch: QueryBatch, m: int) -> List[Hits]:
+        out = []
+        for text in batch.texts:
+            found = self.match(text)
+            if batch.mask is not None:
+                found = {d: s for d, s in found.items() if batch.mask[d]}
+            idx = np.array(list(found), dtype=np.int64)
+            idx, scores = sorted_hits(idx, np.array(list(found.values()), dtype=np.float64))
+            out.append((idx[:m], scores[:m]))
+        return out
+
+
+RETRIEVER_TYPES = {"dense": DenseRetriever, "bm25": BM25Retriever, "name": NameRetriever}
+
+
+def parse_retrievers(spec: str) -> List[str]:
+    names = [x.strip() for x in spec.split(",") if x.strip()]
+    for nm in names:
+        if nm not in RETRIEVER_TYPES:
+            raise ValueError("unknown retriever: " + nm)
+    return names
+
+
+def build_retrievers(rec: Any, names: Optional[List[str]] = None) -> List[Any]:
+    return [RETRIEVER_TYPES[nm](rec) for nm in (parse_retrievers(RETRIEVERS) if names is None else names)]
+
+
+def normalize(values: np.ndarray, ref: np.ndarray, norm: str, method: str) -> np.ndarray:
+    if method == "rrf":
+        return 1.0 / (RRF_K + np.arange(1, len(values) + 1))
+    if method == "minmax":
+        lo, hi = ref.min(), ref.max()
+        return np.maximum(values - lo, 0.0) / (hi - lo) if hi > lo else np.ones_like(values)
+    if method == "zscore":
+        sd = ref.std()
+        return (values - ref.mean()) / sd if sd > 0 else np.zeros_like(values)
+    if norm == "max":
+        top = ref.max()
+        return values / (top if top > 0 else 1.0)
+    return values
+
+
+def fuse(
+    hits: List[Hits],
+    weights: List[float],
+    norms: List[str],
+    n: int,
+    method: str = FUSION_METHOD,
+    fills: Optional[List[Optional[Callable[[np.ndarray], np.ndarray]]]] = None,
+) -> Hits:
+    if method not in FUSION_METHODS:
+        raise ValueError("unknown fusion method: " + method)
+    uniq = np.unique(np.concatenate([idx for idx, _ in hits])) if hits else empty_hits()[0]
+    if not len(uniq):
+        return empty_hits()
+    total = np.zeros(len(uniq))
+    for r, ((idx, scores), w, norm) in enumerate(zip(hits, weights, norms)):
+        if not len(idx) or not w:
+            continue
+        fill = fills[r] if fills else None
+        if fill is not None and method != "rrf":
+            total += w * normalize(fill(uniq), scores, norm, method)
+        else:
+            vals = w * normalize(scores, scores, norm, method)
+            if method == "zscore":
+                total += vals.min()
+                vals = vals - vals.min()
+            total[np.searchsorted(uniq, idx)] += vals
+    idx, scores = sorted_hits(uniq, total)
+    return idx[:n], scores[:n]
+
+
+def fuse_batch(
+    retrievers: List[Any],
+    batch: QueryBatch,
+    n: int,
+    method: str = FUSION_METHOD,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[Hits]:
+    m = RETRIEVER_DEPTH or n
+    results = []
+    for r in retrievers:
+        with timed(r.name):
+            results.append(r.retrieve(batch, m))
+    ws = [(weights or {}).get(r.name, r.weight) for r in retrievers]
+    norms = [r.norm for r in retrievers]
+    out = []
+    with timed("merge"):
+        for qi in range(len(batch.preps)):
+            fills = [partial(r.fill, batch, qi) if hasattr(r, "fill") else None for r in retrievers]
+            out.append(fuse([res[qi] for res in results], ws, norms, n, method, fills))
+    return out
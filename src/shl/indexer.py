@@ -1,70 +1,173 @@
 import os
 import json
-from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
-from .catalog_schema import Assessment
+import time
+import hashlib
+import itertools
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Deque, Iterator, Optional, Tuple, Union
+import numpy as np
+from .artifacts import build_artifacts, save_artifacts, ARTIFACTS_DIR
+from .catalog_schema import Assessment, build_text, content_hash, read_jsonl
+from .catalog_store import open_catalog, AssessmentView
+from .embcache import EmbeddingCache
+from .encoder import load_encoder, encoder_name, MODEL_NAME
+from .filters import chroma_metadata
+from .serving import set_torch_threads
+from .vectorstore import get_store, COLLECTION_NAME, VECTOR_BACKEND
 
 
 CATALOG_PATH = "data/catalog.jsonl"
-CHROMA_DIR = "data/chroma"
-COLLECTION_NAME = "shl_assessments"
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MANIFEST_PATH = "data/index_manifest.json"
+INDEX_SCHEMA = 2
+INDEX_WORKERS = int(os.getenv("SHL_INDEX_WORKERS", "1"))
+INDEX_CHUNK = int(os.getenv("SHL_INDEX_CHUNK", "1024"))
+ENCODE_BATCH = int(os.getenv("SHL_ENCODE_BATCH", "64"))
 
+WORKER_MODEL = None
 
-def load_catalog() -> List[Assessment]:
-    items = []
-    if not os.path.exists(CATALOG_PATH):
-        return items
-    with open(CATALOG_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            d = json.loads(line)
-            items.append(Assessment.from_dict(d))
-    return items
 
+def load_catalog() -> List[Union[Assessment, AssessmentView]]:
+    store = open_catalog(CATALOG_PATH)
+    if store is None:
+        return read_jsonl(CATALOG_PATH)
+    return list(store)
 
-def build_text(a: Assessment) -> str:
-    parts = [
-        a.name,
-        a.description,
-        "skills: " + ", ".join(a.skills),
-        "tags: " + ", ".join(a.tags),
-        "type: " + a.type,
-    ]
-    return " | ".join([p for p in parts if p])
 
+def index_hash(a: Union[Assessment, AssessmentView]) -> str:
+    meta = json.dumps(chroma_metadata(a), sort_keys=True)
+    return hashlib.sha1((content_hash(a) + meta).encode("utf-8")).hexdigest()
 
-def get_client():
-    os.makedirs(CHROMA_DIR, exist_ok=True)
-    client = chromadb.PersistentClient(path=CHROMA_DIR, settings=Settings(anonymized_telemetry=False))
-    return client
 
+def load_manifest() -> Dict[str, Any]:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-def get_collection(client):
-    col = client.get_or_create_collection(name=COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
-    return col
 
+def save_manifest(m: Dict[str, Any]) -> None:
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(m, f)
+    os.replace(tmp, MANIFEST_PATH)
 
-def index() -> Dict[str, Any]:
+
+def init_worker(encoder: str, threads: int) -> None:
+    global WORKER_MODEL
+    set_torch_threads(threads)
+    WORKER_MODEL = load_encoder(encoder)
+
+
+def encode_texts(model, texts: List[str]) -> np.ndarray:
+    embs = model.encode(texts, normalize_embeddings=True, batch_size=ENCODE_BATCH, show_progress_bar=False)
+    return np.asarray(embs, dtype=np.float32)
+
+
+def encode_worker(texts: List[str]) -> np.ndarray:
+    return encode_texts(WORKER_MODEL, texts)
+
+
+def embed_chunks(
+    docs: List[str], encoder: str, cache: EmbeddingCache, workers: int = 1, chunk: int = INDEX_CHUNK
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    spans = iter([(lo, min(lo + chunk, len(docs))) for lo in range(0, len(docs), chunk)])
+    pool = None
+    if workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp.get_context("spawn"), initializer=init_worker, initargs=(encoder, threads)
+        )
+    model = None
+    inflight: Deque[Tuple[int, int, List[Optional[np.ndarray]], List[str], Any]] = deque()
+
+    def submit(lo: int, hi: int) -> None:
+        part = docs[lo:hi]
+        rows = cache.get_many(part)
+        miss = list(dict.fromkeys(t for t, row in zip(part, rows) if row is None))
+        fut = pool.submit(encode_worker, miss) if pool is not None and miss else None
+        inflight.append((lo, hi, rows, miss, fut))
+
+    try:
+        for span in itertools.islice(spans, max(1, workers) * 2):
+            submit(*span)
+        while inflight:
+            lo, hi, rows, miss, fut = inflight.popleft()
+            span = next(spans, None)
+            if span is not None:
+                submit(*span)
+            if miss:
+                if fut is not None:
+                    embs = fut.result()
+                else:
+                    model = model or load_encoder(encoder)
+                    embs = encode_texts(model, miss)
+                cache.put_many(miss, embs)
+                fresh = dict(zip(miss, embs))
+                rows = [row if row is not None else fresh[t] for t, row in zip(docs[lo:hi], rows)]
+            yield lo, hi, np.vstack(rows)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def index(
+    backend: Optional[str] = None,
+    incremental: bool = False,
+    encoder: Optional[str] = None,
+    workers: int = INDEX_WORKERS,
+    chunk: int = INDEX_CHUNK,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
     items = load_catalog()
     if not items:
         return {"indexed": 0}
-    model = SentenceTransformer(MODEL_NAME)
-    client = get_client()
-    col = get_collection(client)
-    ids = []
-    docs = []
-    metas = []
-    for a in items:
-        ids.append(a.id)
-        docs.append(build_text(a))
-        metas.append({"name": a.name, "url": a.url, "type": a.type})
-    embs = model.encode(docs, normalize_embeddings=True, batch_size=64, show_progress_bar=False)
-    col.delete(ids=ids)
-    col.add(ids=ids, embeddings=embs.tolist(), documents=docs, metadatas=metas)
-    return {"indexed": len(ids), "collection": COLLECTION_NAME}
-
+    backend = backend or VECTOR_BACKEND
+    encoder = encoder_name(encoder)
+    store = get_store(backend)
+    hashes = {a.id: index_hash(a) for a in items}
+    manifest = load_manifest() if incremental else {}
+    full = not (
+        manifest.get("model") == MODEL_NAME
+        and manifest.get("encoder") == encoder
+        and manifest.get("backend") == backend
+        and manifest.get("schema") == INDEX_SCHEMA
+        and store.count()
+    )
+    old = {} if full else manifest.get("hashes", {})
+    changed = list({a.id: a for a in items if old.get(a.id) != hashes[a.id]}.values())
+    removed = [i for i in old if i not in hashes]
+    workers = max(1, min(workers, os.cpu_count() or 1))
+    if changed:
+        cache = EmbeddingCache(encoder)
+        docs = [build_text(a) for a in changed]
+        store.begin(list(hashes))
+        done = 0
+        for lo, hi, embs in embed_chunks(docs, encoder, cache, workers=workers, chunk=chunk):
+            part = changed[lo:hi]
+            store.add_chunk([a.id for a in part], embs, docs[lo:hi], [chroma_metadata(a) for a in part])
+            done = hi
+            if progress is not None:
+                dt = time.perf_counter() - t0
+                progress({"done": done, "total": len(changed), "seconds": dt, "docs_per_sec": done / dt if dt else 0.0})
+        store.commit()
+        cache.flush()
+    if removed:
+        store.delete(removed)
+    save_manifest({"model": MODEL_NAME, "encoder": encoder, "backend": backend, "schema": INDEX_SCHEMA, "hashes": hashes})
+    save_artifacts(build_artifacts(items), CATALOG_PATH)
+    dt = time.perf_counter() - t0
+    return {
+        "indexed": len(changed),
+        "removed": len(removed),
+        "total": len(items),
+        "collection": COLLECTION_NAME,
+        "backend": type(store).__name__,
+        "encoder": encoder,
+        "artifacts": ARTIFACTS_DIR,
+        "workers": workers,
+        "seconds": dt,
+        "docs_per_sec": len(changed) / dt if dt else 0.0,
+    }
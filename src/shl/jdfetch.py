@@ -0,0 +1,114 @@
+import os
+import time
+from html.parser import HTMLParser
+from typing import Dict, Any, Optional
+import httpx
+from .cache import LRUCache
+from .metrics import observe
+
+
+JD_MAX_CHARS = 5000
+JD_TIMEOUT = float(os.getenv("SHL_JD_TIMEOUT", "10"))
+JD_CACHE_SIZE = int(os.getenv("SHL_JD_CACHE_SIZE", "512"))
+JD_CACHE_FRESH = float(os.getenv("SHL_JD_CACHE_FRESH", "300"))
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+SKIP_TAGS = {"script", "style", "noscript"}
+
+
+class TextExtractor(HTMLParser):
+    def __init__(self, limit: int = JD_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.skip = 0
+
+    @property
+    def done(self) -> bool:
+        return self.size >= self.limit
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip:
+            self.skip -= 1
+
+    def handle_data(self, data):
+        if self.skip or self.done:
+            return
+        words = data.split()
+        if words:
+            chunk = " ".join(words)
+            self.parts.append(chunk)
+            self.size += len(chunk) + 1
+
+    def text(self) -> str:
+        return " ".join(self.parts)[: self.limit]
+
+
+class JDFetcher:
+    def __init__(self, cache_size: int = JD_CACHE_SIZE, fresh: float = JD_CACHE_FRESH, timeout: float = JD_TIMEOUT):
+        self.cache = LRUCache(cache_size)
+        self.fresh = fresh
+        self.timeout = timeout
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+            )
+        return self.client
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def fetch(self, url: str) -> str:
+        entry: Optional[Dict[str, Any]] = self.cache.get(url)
+        now = time.monotonic()
+        if entry is not None and now - entry["fetched"] < self.fresh:
+            return entry["text"]
+        hdrs = {}
+        if entry is not None:
+            if entry.get("etag"):
+                hdrs["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                hdrs["If-Modified-Since"] = entry["last_modified"]
+        t0 = time.perf_counter()
+        extract = 0.0
+        try:
+            async with self.get_client().stream("GET", url, headers=hdrs) as r:
+                if r.status_code == 304 and entry is not None:
+                    self.cache.put(url, dict(entry, fetched=now))
+                    observe("jd_fetch", time.perf_counter() - t0)
+                    return entry["text"]
+                parser = TextExtractor()
+                async for chunk in r.aiter_text():
+                    t1 = time.perf_counter()
+                    parser.feed(chunk)
+                    extract += time.perf_counter() - t1
+                    if parser.done:
+                        break
+                text = parser.text()
+                observe("jd_fetch", time.perf_counter() - t0 - extract)
+                observe("jd_extract", extract)
+                if r.status_code == 200:
+                    self.cache.put(
+                        url,
+                        {
+                            "text": text,
+                            "etag": r.headers.get("etag"),
+                            "last_modified": r.headers.get("last-modified"),
+                            "fetched": now,
+                        },
+                    )
+                return text
+        except Exception:
+            return entry["text"] if entry is not None else ""
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SERVER_TIMING = os.getenv("SHL_SERVER_TIMING", "0") == "1"
+
+stage_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("stage_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label: str, buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self.series: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, label: str) -> None:
+        with self.lock:
+            s = self.series.get(label)
+            if s is None:
+                s = self.series[label] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = ["# HELP %s %s" % (self.name, self.help), "# TYPE %s histogram" % self.name]
+        with self.lock:
+            for lv, s in sorted(self.series.items()):
+                for i, b in enumerate(self.buckets):
+                    lines.append('%s_bucket{%s="%s",le="%g"} %d' % (self.name, self.label, lv, b, s[i]))
+                lines.append('%s_bucket{%s="%s",le="+Inf"} %d' % (self.name, self.label, lv, s[-1]))
+                lines.append('%s_sum{%s="%s"} %.6f' % (self.name, self.label, lv, s[-2]))
+                lines.append('%s_count{%s="%s"} %d' % (self.name, self.label, lv, s[-1]))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.histograms: List[Histogram] = []
+        self.gauges: List[Tuple[str, str, str, Callable[[], Any]]] = []
+
+    def histogram(self, name: str, help: str, label: str) -> Histogram:
+        h = Histogram(name, help, label)
+        self.histograms.append(h)
+        return h
+
+    def gauge(self, name: str, help: str, fn: Callable[[], Any], kind: str = "gauge") -> None:
+        self.gauges.append((name, help, kind, fn))
+
+    def render(self) -> str:
+        lines = []
+        for h in self.histograms:
+            lines.extend(h.render())
+        for name, help, kind, fn in self.gauges:
+            try:
+                v = fn()
+            except Exception:
+                continue
+            lines.append("# HELP %s %s" % (name, help))
+            lines.append("# TYPE %s %s" % (name, kind))
+            if isinstance(v, dict):
+                for labels, x in sorted(v.items()):
+                    lines.append("%s{%s} %s" % (name, labels, float(x)))
+            else:
+                lines.append("%s %s" % (name, float(v)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGES = REGISTRY.histogram("shl_stage_seconds", "Latency of recommend pipeline stages.", "stage")
+
+
+def observe(stage: str, seconds: float) -> None:
+    STAGES.observe(seconds, stage)
+    d = stage_timings.get()
+    if d is not None:
+        d[stage] = d.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+
+@contextmanager
+def capture() -> Iterator[Dict[str, float]]:
+    d: Dict[str, float] = {}
+    token = stage_timings.set(d)
+    try:
+        yield d
+    finally:
+        stage_timings.reset(token)
+
+
+def server_timing_header(d: Dict[str, float]) -> str:
+    return ", ".join("%s;dur=%.2f" % (k, v * 1000.0) for k, v in d.items())
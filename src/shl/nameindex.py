@@ -0,0 +1,167 @@
+import os
+import re
+from bisect import bisect_left
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+
+
+FUZZY_MIN = float(os.getenv("SHL_FUZZY_MIN", "0.45"))
+PREFIX_SCAN = 2000
+SUGGEST_LIMIT = 10
+TYPO_MIN_LEN = 3
+KIND_RANK = {"name": 0, "skill": 1}
+TOKEN = re.compile(r"\w+")
+NAME_NOISE = re.compile(r"\((?:new|updated|revised|beta)\)")
+
+
+def name_key(text: str) -> str:
+    return " ".join(TOKEN.findall(NAME_NOISE.sub(" ", text.lower())))
+
+
+def deletes(token: str) -> List[str]:
+    return [token] + [token[:i] + token[i + 1 :] for i in range(len(token))]
+
+
+def edit_distance(a: str, b: str) -> int:
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def trigrams(key: str) -> List[str]:
+    padded = "  " + key + " "
+    return sorted(set(padded[i : i + 3] for i in range(len(padded) - 2)))
+
+
+class NameIndex:
+    def __init__(self, names: List[str], skills: List[List[str]]):
+        pos: Dict[Tuple[str, str], int] = {}
+        self.keys: List[str] = []
+        self.kinds: List[str] = []
+        self.labels: List[str] = []
+        docs: List[List[int]] = []
+        for kind, rows in (("name", [[nm] for nm in names]), ("skill", skills)):
+            for i, row in enumerate(rows):
+                for label in row:
+                    key = name_key(label)
+                    if not key:
+                        continue
+                    e = pos.get((kind, key))
+                    if e is None:
+                        e = pos[(kind, key)] = len(self.keys)
+                        self.keys.append(key)
+                        self.kinds.append(kind)
+                        self.labels.append(label.strip())
+                        docs.append([])
+                    if not docs[e] or docs[e][-1] != i:
+                        docs[e].append(i)
+        self.docs = [np.array(d, dtype=np.int64) for d in docs]
+        self.exact: Dict[str, List[int]] = {}
+        for e, key in enumerate(self.keys):
+            self.exact.setdefault(key, []).append(e)
+        variants = []
+        for e, key in enumerate(self.keys):
+            starts = [0] + [m.start() + 1 for m in re.finditer(" ", key)]
+            variants.extend((key[s:], s, e) for s in starts)
+        variants.sort()
+        self.variants = [v for v, _, _ in variants]
+        self.variant_start = np.array([s for _, s, _ in variants], dtype=np.int32)
+        self.variant_entry = np.array([e for _, _, e in variants], dtype=np.int64)
+        grams: Dict[str, List[int]] = {}
+        for e, key in enumerate(self.keys):
+            for g in trigrams(key):
+                grams.setdefault(g, []).append(e)
+        self.gram_ids = {g: i for i, g in enumerate(grams)}
+        self.gram_indptr = np.zeros(len(grams) + 1, dtype=np.int64)
+        self.gram_indptr[1:] = np.cumsum([len(v) for v in grams.values()])
+        self.gram_entries = np.array([e for v in grams.values() for e in v], dtype=np.int64)
+        self.gram_count = np.array([len(trigrams(k)) for k in self.keys], dtype=np.int64)
+        self.max_tokens = max((k.count(" ") + 1 for k in self.keys), default=0)
+        self.vocab: Dict[str, int] = {}
+        for key in self.keys:
+            for t in set(key.split()):
+                self.vocab[t] = self.vocab.get(t, 0) + 1
+        self.typos: Dict[str, List[str]] = {}
+        for t in self.vocab:
+            if len(t) >= TYPO_MIN_LEN and not t.isdigit():
+                for d in set(deletes(t)):
+                    self.typos.setdefault(d, []).append(t)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def correct_token(self, token: str) -> Tuple[str, int]:
+        if token in self.vocab or len(token) < TYPO_MIN_LEN or token.isdigit():
+            return token, 0
+        found = {c for d in set(deletes(token)) for c in self.typos.get(d, ())}
+        if not found:
+            return token, 0
+        best = min(found, key=lambda c: (edit_distance(token, c), -self.vocab[c], c))
+        return best, edit_distance(token, best)
+
+    def correct(self, text: str) -> Tuple[str, int]:
+        fixed = [self.correct_token(t) for t in name_key(text).split()]
+        return " ".join(t for t, _ in fixed), sum(d for _, d in fixed)
+
+    def resolve(self, text: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        key = name_key(text)
+        if key.count(" ") >= self.max_tokens:
+            return None
+        entries = self.exact.get(key) or self.exact.get(self.correct(key)[0])
+        if not entries:
+            return None
+        empty = np.zeros(0, dtype=np.int64)
+        names = [self.docs[e] for e in entries if self.kinds[e] == "name"]
+        skills = [self.docs[e] for e in entries if self.kinds[e] == "skill"]
+        return names[0] if names else empty, skills[0] if skills else empty
+
+    def prefix(self, text: str, limit: int = SUGGEST_LIMIT) -> List[int]:
+        p = name_key(text)
+        if not p:
+            return []
+        lo = bisect_left(self.variants, p)
+        hi = lo
+        end = min(len(self.variants), lo + PREFIX_SCAN)
+        while hi < end and self.variants[hi].startswith(p):
+            hi += 1
+        seen: Dict[int, int] = {}
+        for s, e in zip(self.variant_start[lo:hi].tolist(), self.variant_entry[lo:hi].tolist()):
+            if e not in seen or s < seen[e]:
+                seen[e] = s
+        ranked = sorted(
+            seen, key=lambda e: (seen[e] > 0, KIND_RANK[self.kinds[e]], -len(self.docs[e]), len(self.keys[e]), self.keys[e])
+        )
+        return ranked[:limit]
+
+    def fuzzy(self, text: str, limit: int = SUGGEST_LIMIT, min_sim: float = FUZZY_MIN) -> List[Tuple[int, float]]:
+        query = trigrams(name_key(text))
+        grams = [self.gram_ids[g] for g in query if g in self.gram_ids]
+        if not grams:
+            return []
+        hits = np.concatenate([self.gram_entries[self.gram_indptr[g] : self.gram_indptr[g + 1]] for g in grams])
+        entries, shared = np.unique(hits, return_counts=True)
+        sim = shared / (len(query) + self.gram_count[entries] - shared)
+        keep = sim >= min_sim
+        entries, sim = entries[keep], sim[keep]
+        order = np.lexsort((entries, -sim))[:limit]
+        return [(int(e), float(s)) for e, s in zip(entries[order], sim[order])]
+
+    def suggest(self, text: str, limit: int = SUGGEST_LIMIT) -> List[Tuple[int, float]]:
+        picked = [(e, 1.0) for e in self.prefix(text, limit)]
+        have = {e for e, _ in picked}
+        if len(picked) < limit:
+            fixed, edits = self.correct(text)
+            if edits:
+                score = 1.0 - edits / float(max(1, len(fixed)))
+                picked.extend((e, score) for e in self.prefix(fixed, limit) if e not in have)
+                have.update(e for e, _ in picked)
+        if len(picked) < limit:
+            picked.extend((e, s) for e, s in self.fuzzy(text, limit) if e not in have)
+        return picked[:limit]
@@ -1,17 +1,43 @@
 import argparse
+import json
+import os
+import sys
+import statistics
 from typing import Dict, Any
 from .scraper import run as scrape_run
-from .indexer import index as index_run
-from .evaluator import evaluate as eval_run, predict_test as predict_run
-import uvicorn
+from .indexer import index as index_run, CATALOG_PATH, INDEX_WORKERS, INDEX_CHUNK
+from .catalog_store import convert as convert_run
+from .evaluator import evaluate as eval_run, predict_test as predict_run, parity as parity_run
+from .bench import run_bench, run_ann_bench, NPROBES, RERANKS
+from .bulk import bulk_predict, BULK_CHUNK
+from .metrics import capture, timed
+from .recommender import Recommender
+from .serving import serve, WORKERS
+from .sweep import sweep as sweep_run, WEIGHTS, POOLS, KS, METHODS, SWEEP_WORKERS
 
 
-def do_scrape() -> Dict[str, Any]:
-    return scrape_run()
+def do_scrape(incremental: bool = False) -> Dict[str, Any]:
+    return scrape_run(incremental=incremental)
 
 
-def do_index() -> Dict[str, Any]:
-    return index_run()
+def report_progress(p: Dict[str, Any]) -> None:
+    print(
+        "indexed %d/%d docs in %.1fs (%.1f docs/s)" % (p["done"], p["total"], p["seconds"], p["docs_per_sec"]),
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def do_index(incremental: bool = False, workers: int = INDEX_WORKERS, chunk: int = INDEX_CHUNK) -> Dict[str, Any]:
+    return index_run(incremental=incremental, workers=workers, chunk=chunk, progress=report_progress)
+
+
+def do_convert() -> Dict[str, Any]:
+    return convert_run(CATALOG_PATH)
+
+
+def do_refresh() -> Dict[str, Any]:
+    return {"scrape": do_scrape(incremental=True), "index": do_index(incremental=True)}
 
 
 def do_evaluate() -> Dict[str, Any]:
@@ -22,15 +48,111 @@ def do_predict() -> str:
     return predict_run()
 
 
+def do_bulk(input_path: str, output: str, k: int, chunk: int) -> Dict[str, Any]:
+    if not output:
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        output = os.path.join("outputs", base + "_predictions.ndjson")
+    return bulk_predict(input_path, output, k=k, chunk=chunk)
+
+
+def do_parity(encoders: str, tolerance: float) -> Dict[str, Any]:
+    return parity_run([e.strip() for e in encoders.split(",") if e.strip()], tolerance=tolerance)
+
+
+def do_sweep(weights: str, pools: str, ks: str, methods: str, workers: int) -> Dict[str, Any]:
+    return sweep_run(
+        weights=[float(x) for x in weights.split(",") if x.strip()],
+        pools=[int(x) for x in pools.split(",") if x.strip()],
+        ks=[int(x) for x in ks.split(",") if x.strip()],
+        methods=[x.strip() for x in methods.split(",") if x.strip()],
+        workers=workers,
+    )
+
+
+def do_profile(query: str, k: int = 10, repeat: int = 5) -> Dict[str, Any]:
+    rec = Recommender()
+    rec.get_model()
+    runs = []
+    for _ in range(max(1, repeat)):
+        rec.result_cache.clear()
+        rec.embed_cache.clear()
+        with capture() as d:
+            with timed("total"):
+                rec.recommend(query, k=k)
+        runs.append(d)
+    stages = list(runs[0])
+    warm = runs[1:] or runs
+    return {
+        "catalog_items": rec.n_docs,
+        "first_ms": {s: round(runs[0][s] * 1000.0, 3) for s in stages},
+        "median_ms": {s: round(statistics.median(r.get(s, 0.0) for r in warm) * 1000.0, 3) for s in stages},
+    }
+
+
+def do_bench(sizes: str, backend: str, encoder: str, queries: int, output: str) -> Dict[str, Any]:
+    r = run_bench(
+        sizes=[int(x) for x in sizes.split(",") if x.strip()],
+        backend=backend,
+        encoder=encoder,
+        n_queries=queries,
+        output=output or None,
+    )
+    return {"output": r["output"], "runs": r["runs"]}
+
+
+def do_ann_bench(sizes: str, encoder: str, queries: int, k: int, nprobes: str, reranks: str, output: str) -> Dict[str, Any]:
+    r = run_ann_bench(
+        sizes=[int(x) for x in sizes.split(",") if x.strip()],
+        encoder=encoder,
+        n_queries=queries,
+        k=k,
+        nprobes=[int(x) for x in nprobes.split(",") if x.strip()],
+        reranks=[int(x) for x in reranks.split(",") if x.strip()],
+        output=output or None,
+    )
+    return {"output": r["output"], "runs": r["runs"]}
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("cmd")
+    p.add_argument("--incremental", action="store_true")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    p.add_argument("--workers", type=int, default=WORKERS)
+    p.add_argument("--encoders", default="torch,int8,onnx,onnx-int8")
+    p.add_argument("--tolerance", type=float, default=0.01)
+    p.add_argument("--query", default="")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--sizes", default="")
+    p.add_argument("--nprobes", default=",".join(str(x) for x in NPROBES))
+    p.add_argument("--reranks", default=",".join(str(x) for x in RERANKS))
+    p.add_argument("--bench-backend", default="numpy")
+    p.add_argument("--bench-encoder", default="hash")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--output", default="")
+    p.add_argument("--input", default="")
+    p.add_argument("--index-workers", type=int, default=INDEX_WORKERS)
+    p.add_argument("--index-chunk", type=int, default=INDEX_CHUNK)
+    p.add_argument("--chunk", type=int, default=BULK_CHUNK)
+    p.add_argument("--weights", default=",".join(str(x) for x in WEIGHTS))
+    p.add_argument("--pools", default=",".join(str(x) for x in POOLS))
+    p.add_argument("--ks", default=",".join(str(x) for x in KS))
+    p.add_argument("--fusion", default=",".join(METHODS))
+    p.add_argument("--sweep-workers", type=int, default=SWEEP_WORKERS)
     args = p.parse_args()
     if args.cmd == "scrape":
-        r = do_scrape()
+        r = do_scrape(incremental=args.incremental)
         print(r)
     elif args.cmd == "index":
-        r = do_index()
+        r = do_index(incremental=args.incremental, workers=args.index_workers, chunk=args.index_chunk)
+        print(r)
+    elif args.cmd == "convert":
+        r = do_convert()
+        print(r)
+    elif args.cmd == "refresh":
+        r = do_refresh()
         print(r)
     elif args.cmd == "evaluate":
         r = do_evaluate()
@@ -38,8 +160,26 @@ def main():
     elif args.cmd == "predict":
         r = do_predict()
         print(r)
+    elif args.cmd == "bulk":
+        r = do_bulk(args.input, args.output, args.k, args.chunk)
+        print(r)
+    elif args.cmd == "parity":
+        r = do_parity(args.encoders, args.tolerance)
+        print(r)
+    elif args.cmd == "sweep":
+        r = do_sweep(args.weights, args.pools, args.ks, args.fusion, args.sweep_workers)
+        print(json.dumps(r, indent=2))
+    elif args.cmd == "profile":
+        r = do_profile(args.query, k=args.k, repeat=args.repeat)
+        print(r)
+    elif args.cmd == "bench":
+        r = do_bench(args.sizes, args.bench_backend, args.bench_encoder, args.queries, args.output)
+        print(json.dumps(r, indent=2))
+    elif args.cmd == "ann-bench":
+        r = do_ann_bench(args.sizes, args.bench_encoder, args.queries, args.k, args.nprobes, args.reranks, args.output)
+        print(json.dumps(r, indent=2))
     elif args.cmd == "serve":
-        uvicorn.run("src.app:app", host="0.0.0.0", port=8000, reload=False)
+        serve(host=args.host, port=args.port, workers=args.workers)
     else:
         print({"error": "unknown cmd"})
 
@@ -0,0 +1,78 @@
+import os
+import re
+from typing import List, Tuple
+from .bm25 import tokenize
+
+
+LONG_QUERY_WORDS = int(os.getenv("SHL_LONG_QUERY_WORDS", "128"))
+CHUNK_WORDS = int(os.getenv("SHL_CHUNK_WORDS", "128"))
+QUERY_TOKEN_BUDGET = int(os.getenv("SHL_QUERY_TOKEN_BUDGET", "768"))
+POOLING = os.getenv("SHL_QUERY_POOLING", "max")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:])\s+|\s*[•·▪●|*]\s*|\s+-\s+")
+BOILERPLATE = re.compile(
+    r"\b(?:equal opportunity|equal employment|affirmative action|regardless of (?:race|gender|age)|"
+    r"all qualified applicants|reasonable accommodations?|privacy (?:policy|notice)|cookie (?:policy|settings|preferences)|"
+    r"apply (?:now|today|online)|click (?:here|apply)|how to apply|follow us|about (?:us|the company)|"
+    r"benefits include|we offer|perks include|competitive (?:salary|pay|compensation)|salary range|"
+    r"paid time off|pto|copyright|all rights reserved|job (?:id|code|ref)|requisition)\b|\b401\(?k\b\)?",
+    re.I,
+)
+MIN_SENTENCE_WORDS = 3
+
+
+def is_long(text: str) -> bool:
+    return len(text.split()) > LONG_QUERY_WORDS
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if s and s.strip()]
+
+
+def keep_sentences(text: str) -> List[str]:
+    out = []
+    seen = set()
+    for s in split_sentences(text):
+        if len(s.split()) < MIN_SENTENCE_WORDS or BOILERPLATE.search(s):
+            continue
+        key = " ".join(tokenize(s))
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(s)
+    return out
+
+
+def chunk_sentences(sentences: List[str], chunk_words: int = CHUNK_WORDS, budget: int = QUERY_TOKEN_BUDGET) -> List[str]:
+    chunks = []
+    cur: List[str] = []
+    used = 0
+    for s in sentences:
+        words = s.split()
+        words = words[: max(0, budget - used)]
+        if not words:
+            break
+        while words:
+            room = chunk_words - len(cur)
+            if room <= 0:
+                chunks.append(" ".join(cur))
+                cur = []
+                room = chunk_words
+            cur.extend(words[:room])
+            used += len(words[:room])
+            words = words[room:]
+    if cur:
+        chunks.append(" ".join(cur))
+    return chunks
+
+
+def bm25_terms(sentences: List[str], budget: int = QUERY_TOKEN_BUDGET) -> List[str]:
+    terms = list(dict.fromkeys(w for s in sentences for w in tokenize(s)))
+    return terms[:budget]
+
+
+def prepare(text: str) -> Tuple[List[str], List[str]]:
+    if not is_long(text):
+        return [text], tokenize(text)
+    sentences = keep_sentences(text) or [text]
+    chunks = chunk_sentences(sentences)
+    return chunks or [" ".join(text.split()[:CHUNK_WORDS])], bm25_terms(sentences)
@@ -1,99 +1,323 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import os
+import sys
 import json
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
-from rank_bm25 import BM25Okapi
-from .catalog_schema import Assessment
-from .indexer import load_catalog, build_text, COLLECTION_NAME, CHROMA_DIR, MODEL_NAME
+import threading
+import numpy as np
+from .artifacts import load_artifacts, build_artifacts
+from .bm25 import tokenize
+from .cache import LRUCache
+from .embcache import EmbeddingCache, encode_cached
+from .encoder import load_encoder, encoder_name
+from .filters import FilterIndex, normalize_filters
+from .fusion import QueryBatch, build_retrievers, fuse_batch, empty_hits, SEM_WEIGHT, FUSION_METHOD
+from .indexer import load_catalog, load_manifest, CATALOG_PATH
+from .metrics import timed
+from .nameindex import NameIndex, SUGGEST_LIMIT
+from .querypre import prepare, is_long
+from .vectorstore import get_store
 
 
-def tokenize(t: str) -> List[str]:
-    return [x.lower() for x in t.split() if x.strip()]
+RESULT_CACHE_SIZE = int(os.getenv("SHL_RESULT_CACHE_SIZE", "2048"))
+EMBED_CACHE_SIZE = int(os.getenv("SHL_EMBED_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.getenv("SHL_CACHE_TTL", "0")) or None
+WARMUP = os.getenv("SHL_WARMUP", "1") == "1"
+TYPE_QUOTAS = os.getenv("SHL_TYPE_QUOTAS", "")
+FAST_PATH = os.getenv("SHL_LOOKUP_FAST_PATH", "1") == "1"
+NAME_MATCH_SCORE = 1.0
+SKILL_MATCH_SCORE = 0.5
+FAST_SKILL_DOCS = int(os.getenv("SHL_FAST_SKILL_DOCS", "25"))
+
+
+def normalize_query(t: str) -> str:
+    return " ".join(t.lower().split())
+
+
+def parse_quotas(spec: str) -> Dict[str, float]:
+    out = {}
+    for part in spec.split(","):
+        if "=" in part:
+            t, v = part.split("=", 1)
+            out[t.strip()] = float(v)
+    return out
 
 
 class Recommender:
-    def __init__(self):
-        self.model = SentenceTransformer(MODEL_NAME)
-        self.client = chromadb.PersistentClient(path=CHROMA_DIR, settings=Settings(anonymized_telemetry=False))
-        self.col = self.client.get_or_create_collection(name=COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
-        self.catalog = load_catalog()
-        self.doc_map = {a.id: build_text(a) for a in self.catalog}
-        corpus = [tokenize(self.doc_map[a.id]) for a in self.catalog]
-        self.bm25 = BM25Okapi(corpus) if corpus else None
-        self.id_order = [a.id for a in self.catalog]
-        self.meta_map = {a.id: {"name": a.name, "url": a.url, "type": a.type} for a in self.catalog}
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        encoder: Optional[str] = None,
+        persist_embeddings: bool = False,
+        quotas: Optional[Dict[str, float]] = None,
+        retrievers: Optional[List[str]] = None,
+        fusion: str = FUSION_METHOD,
+    ):
+        self.encoder = encoder_name(encoder)
+        built = load_manifest().get("encoder")
+        if built and built != self.encoder:
+            raise RuntimeError("index was built with encoder %s but %s was requested; re-run index" % (built, self.encoder))
+        self.disk_cache = EmbeddingCache(self.encoder) if persist_embeddings else None
+        self.model = None
+        self.model_error = None
+        self.model_ready = threading.Event()
+        threading.Thread(target=self.load_model, daemon=True).start()
+        self.store = get_store(backend)
+        art = load_artifacts(CATALOG_PATH) or build_artifacts(load_catalog())
+        self.bm25 = art["bm25"]
+        self.filters: FilterIndex = art["filters"]
+        self.id_order = art["id"]
+        self.n_docs = len(self.id_order)
+        self.id_index = {idv: i for i, idv in enumerate(self.id_order)}
+        self.store_rows = self.store.align(self.id_order)
+        self.type_names = list(dict.fromkeys(art["type"]))
+        self.type_codes = {t: i for i, t in enumerate(self.type_names)}
+        self.type_code = np.array([self.type_codes[t] for t in art["type"]], dtype=np.int32)
+        groups: Dict[str, int] = {}
+        self.group_id = np.array([groups.setdefault(nm.lower(), len(groups)) for nm in art["name"]], dtype=np.int32)
+        self.records = [(nm, u, sys.intern(t)) for nm, u, t in zip(art["name"], art["url"], art["type"])]
+        self.names = NameIndex(art["name"], art["skills"])
+        self.quotas = parse_quotas(TYPE_QUOTAS) if quotas is None else quotas
+        self.limits: Dict[int, List[int]] = {}
+        self.retrievers = build_retrievers(self, retrievers)
+        self.fusion = fusion
+        self.result_cache = LRUCache(RESULT_CACHE_SIZE, CACHE_TTL)
+        self.embed_cache = LRUCache(EMBED_CACHE_SIZE, CACHE_TTL)
 
-    def hybrid_candidates(self, query: str, n: int = 50) -> List[Tuple[str, float]]:
-        if not self.catalog:
-            return []
-        qe = self.model.encode([query], normalize_embeddings=True, show_progress_bar=False)[0]
-        res = self.col.query(query_embeddings=[qe.tolist()], n_results=min(n, 200))
-        ids = res["ids"][0]
-        sims = res["distances"][0]
-        sem = {ids[i]: 1.0 - sims[i] for i in range(len(ids))}
-        toks = tokenize(query)
-        lex = {}
+    def load_model(self) -> None:
+        try:
+            model = load_encoder(self.encoder)
+            if WARMUP:
+                model.encode(["warmup"], normalize_embeddings=True, show_progress_bar=False)
+            self.model = model
+        except Exception as e:
+            self.model_error = e
+        finally:
+            self.model_ready.set()
+
+    def get_model(self):
+        self.model_ready.wait()
+        if self.model is None:
+            raise RuntimeError("embedding model failed to load") from self.model_error
+        return self.model
+
+    def ready(self) -> bool:
+        return self.model_ready.is_set() and self.model is not None
+
+    def after_fork(self) -> None:
+        self.store.reopen()
+        self.result_cache.clear()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"results": self.result_cache.stats(), "embeddings": self.embed_cache.stats()}
+
+    def embed(self, queries: List[str]) -> np.ndarray:
+        keys = [normalize_query(q) for q in queries]
+        rows = [self.embed_cache.get(key) for key in keys]
+        miss = list(dict.fromkeys(key for key, row in zip(keys, rows) if row is None))
+        if miss:
+            with timed("encode"):
+                if self.disk_cache is not None:
+                    embs = encode_cached(miss, self.disk_cache, self.get_model)
+                else:
+                    embs = self.get_model().encode(miss, normalize_embeddings=True, batch_size=64, show_progress_bar=False)
+            fresh = {}
+            for key, e in zip(miss, embs):
+                e = np.array(e, dtype=np.float32)
+                e.setflags(write=False)
+                self.embed_cache.put(key, e)
+                fresh[key] = e
+            rows = [row if row is not None else fresh[key] for key, row in zip(keys, rows)]
+        return np.vstack(rows)
+
+    def fast_candidates(
+        self, text: str, n: int, fkey: Tuple[Tuple[str, Any], ...] = ()
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if is_long(text):
+            return None
+        found = self.names.resolve(text)
+        if found is None:
+            return None
+        names, skills = found
+        if len(skills) > FAST_SKILL_DOCS:
+            skills = skills[:0]
+        mask = self.filters.mask(fkey)
+        if mask is not None:
+            names, skills = names[mask[names]], skills[mask[skills]]
+        if not len(names) and not len(skills):
+            return None
+        parts = [names, skills]
+        terms = tokenize(text)
+        if self.bm25 is not None:
+            parts.append(self.bm25.top(terms, n, mask=mask)[0])
+        idx = np.unique(np.concatenate(parts))
+        scores = NAME_MATCH_SCORE * np.isin(idx, names) + SKILL_MATCH_SCORE * np.isin(idx, skills)
         if self.bm25 is not None:
-            scores = self.bm25.get_scores(toks)
-            lex = {self.id_order[i]: float(scores[i]) for i in range(len(self.id_order))}
-            m = float(scores.max()) if hasattr(scores, "max") and scores.max() > 0 else 1.0
-            for k in lex:
-                lex[k] = lex[k] / m
-        merged = {}
-        for k in sem:
-            merged[k] = 0.7 * sem[k] + 0.3 * lex.get(k, 0.0)
-        for k in lex:
-            if k not in merged:
-                merged[k] = 0.3 * lex[k]
-        items = list(merged.items())
-        items.sort(key=lambda x: x[1], reverse=True)
-        return items[:n]
+            lex = self.bm25.score_docs(terms, idx)
+            scores = scores + (1.0 - SEM_WEIGHT) * lex / (lex.max() if lex.max() > 0 else 1.0)
+        order = np.lexsort((idx, -scores))[:n]
+        return idx[order], scores[order]
 
-    def balance(self, items: List[Tuple[str, float]], k: int = 10) -> List[Dict[str, Any]]:
+    def resolve(
+        self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        if not FAST_PATH:
+            return None
+        fkey = normalize_filters(filters)
+        t = normalize_query(query)
+        with timed("lookup"):
+            cand = self.fast_candidates(t, max(50, k * 5), fkey)
+        if cand is None:
+            return None
+        items = self.select(*cand, k=k)
+        self.result_cache.put((t, k, fkey), items)
+        return [dict(it) for it in items]
+
+    def autocomplete(self, prefix: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, Any]]:
         out = []
-        k_quota = max(2, k // 2)
-        p_quota = k - k_quota
-        k_count = 0
-        p_count = 0
-        seen_names = set()
-        for idv, sc in items:
-            meta = self.meta_map.get(idv)
-            if not meta:
-                continue
-            name = meta["name"]
-            typ = meta.get("type", "")
-            if typ == "K" and k_count >= k_quota:
-                continue
-            if typ == "P" and p_count >= p_quota:
+        for e, score in self.names.suggest(prefix, limit):
+            docs = self.names.docs[e]
+            it = {"text": self.names.labels[e], "kind": self.names.kinds[e], "count": len(docs), "score": score}
+            if it["kind"] == "name":
+                _, it["url"], it["type"] = self.records[docs[0]]
+            out.append(it)
+        return out
+
+    def hybrid_candidates_many(
+        self,
+        queries: List[str],
+        n: int = 50,
+        embeddings: Optional[List[np.ndarray]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        cands = self.candidate_arrays(queries, n=n, embeddings=embeddings, filters=filters)
+        return [[(self.id_order[i], float(sc)) for i, sc in zip(idx.tolist(), scores)] for idx, scores in cands]
+
+    def candidate_arrays(
+        self,
+        queries: List[str],
+        n: int = 50,
+        embeddings: Optional[List[np.ndarray]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        fkey = normalize_filters(filters)
+        mask = self.filters.mask(fkey) if self.n_docs else None
+        if not self.n_docs or not queries or (mask is not None and not mask.any()):
+            return [empty_hits() for _ in queries]
+        with timed("preprocess"):
+            preps = [prepare(q) for q in queries]
+        if embeddings is not None:
+            embeddings = [np.atleast_2d(np.asarray(e, dtype=np.float32)) for e in embeddings]
+        batch = QueryBatch(queries, preps, embeddings, mask, fkey)
+        return fuse_batch(self.retrievers, batch, n if mask is None else min(n, len(batch.allowed)), self.fusion)
+
+    def hybrid_candidates(self, query: str, n: int = 50) -> List[Tuple[str, float]]:
+        return self.hybrid_candidates_many([query], n=n)[0]
+
+    def quota_limits(self, k: int) -> List[int]:
+        limits = self.limits.get(k)
+        if limits is None:
+            if self.quotas:
+                q = {t: int(v) if v >= 1 else max(1, int(v * k)) for t, v in self.quotas.items()}
+            else:
+                k_quota = max(2, k // 2)
+                q = {"K": k_quota, "P": k - k_quota}
+            limits = [k] * len(self.type_names)
+            for t, v in q.items():
+                if t in self.type_codes:
+                    limits[self.type_codes[t]] = v
+            self.limits[k] = limits
+        return limits
+
+    def select(self, idx: np.ndarray, scores: np.ndarray, k: int = 10) -> List[Dict[str, Any]]:
+        limits = self.quota_limits(k)
+        counts = [0] * len(limits)
+        groups = self.group_id[idx].tolist()
+        types = self.type_code[idx].tolist()
+        seen = set()
+        picked = []
+        overflow = []
+        for j, (g, t) in enumerate(zip(groups, types)):
+            if counts[t] >= limits[t]:
+                overflow.append(j)
                 continue
-            key = name.lower()
-            if key in seen_names:
+            if g in seen:
                 continue
-            seen_names.add(key)
-            out.append({"name": name, "url": meta["url"], "type": typ, "score": sc})
-            if typ == "K":
-                k_count += 1
-            elif typ == "P":
-                p_count += 1
-            if len(out) >= k:
+            seen.add(g)
+            counts[t] += 1
+            picked.append(j)
+            if len(picked) >= k:
                 break
-        i = 0
-        while len(out) < k and i < len(items):
-            idv, sc = items[i]
-            i += 1
-            meta = self.meta_map.get(idv)
-            if not meta:
-                continue
-            name = meta["name"]
-            key = name.lower()
-            if key in seen_names:
-                continue
-            seen_names.add(key)
-            out.append({"name": name, "url": meta["url"], "type": meta.get("type", ""), "score": sc})
-        return out[:k]
+        else:
+            for j in overflow:
+                if len(picked) >= k:
+                    break
+                if groups[j] not in seen:
+                    seen.add(groups[j])
+                    picked.append(j)
+        out = []
+        for j in picked:
+            name, url, typ = self.records[idx[j]]
+            out.append({"name": name, "url": url, "type": typ, "score": float(scores[j])})
+        return out
+
+    def balance(self, items: List[Tuple[str, float]], k: int = 10) -> List[Dict[str, Any]]:
+        pairs = [(self.id_index[idv], sc) for idv, sc in items if idv in self.id_index]
+        if not pairs:
+            return []
+        idx, scores = zip(*pairs)
+        return self.select(np.array(idx, dtype=np.int64), np.array(scores, dtype=np.float64), k=k)
+
+    def recommend(self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.recommend_many([query], k=k, filters=filters)[0]
+
+    def lookup(self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        hit = self.result_cache.get((normalize_query(query), k, normalize_filters(filters)))
+        return None if hit is None else [dict(it) for it in hit]
+
+    def compute_many(
+        self,
+        queries: List[str],
+        k: int = 10,
+        embeddings: Optional[List[np.ndarray]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        fast_path: bool = FAST_PATH,
+    ) -> List[List[Dict[str, Any]]]:
+        fkey = normalize_filters(filters)
+        texts = [normalize_query(q) for q in queries]
+        n = max(50, k * 5)
+        cands: List[Optional[Tuple[np.ndarray, np.ndarray]]] = [None] * len(texts)
+        if fast_path:
+            with timed("lookup"):
+                cands = [self.fast_candidates(t, n, fkey) for t in texts]
+        rest = [i for i, c in enumerate(cands) if c is None]
+        if rest:
+            embs = None if embeddings is None else [embeddings[i] for i in rest]
+            for i, c in zip(rest, self.candidate_arrays([texts[i] for i in rest], n=n, embeddings=embs, filters=fkey)):
+                cands[i] = c
+        out = []
+        for t, (idx, scores) in zip(texts, cands):
+            with timed("balance"):
+                items = self.select(idx, scores, k=k)
+            self.result_cache.put((t, k, fkey), items)
+            out.append([dict(it) for it in items])
+        return out
 
-    def recommend(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
-        cands = self.hybrid_candidates(query, n=max(50, k * 5))
-        return self.balance(cands, k=k) if cands else []
+    def recommend_many(
+        self, queries: List[str], k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        fkey = normalize_filters(filters)
+        out = [None] * len(queries)
+        miss = {}
+        for i, q in enumerate(queries):
+            key = normalize_query(q)
+            hit = self.result_cache.get((key, k, fkey))
+            if hit is not None:
+                out[i] = hit
+            else:
+                miss.setdefault(key, []).append(i)
+        if miss:
+            texts = list(miss)
+            for t, items in zip(texts, self.compute_many(texts, k=k, filters=fkey)):
+                for i in miss[t]:
+                    out[i] = items
+        return [[dict(it) for it in items] for items in out]
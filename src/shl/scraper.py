@@ -1,18 +1,32 @@
 import asyncio
-from typing import List, Dict, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+from urllib.parse import urlsplit
 import re
 import time
 import os
+import json
 from bs4 import BeautifulSoup
-import requests
+import httpx
 from playwright.async_api import async_playwright
-from .catalog_schema import Assessment, canonical_id, now_iso
+from .catalog_schema import Assessment, canonical_id, now_iso, content_hash, read_jsonl, write_jsonl
+from .catalog_store import write_store
 
 
 CATALOG_URL = "https://www.shl.com/products/product-catalog/"
 KENEXA_URL = "https://www.shl.com/c/global/ibm-kenexa-catalog/"
 OUTPUT_DIR = "data"
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "catalog.jsonl")
+HTTP_META_FILE = os.path.join(OUTPUT_DIR, "http_meta.json")
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+CONCURRENCY = int(os.getenv("SHL_SCRAPE_CONCURRENCY", "8"))
+RATE_PER_HOST = float(os.getenv("SHL_SCRAPE_RATE", "4"))
+PARSE_WORKERS = int(os.getenv("SHL_SCRAPE_WORKERS", "0")) or None
+RETRIES = 3
+BACKOFF = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+GONE_STATUS = {404, 410}
+SCROLL_ROUNDS = 50
 
 
 def ensure_dirs():
@@ -38,6 +52,28 @@ def parse_type(text: str) -> str:
     return t[:1] if t else ""
 
 
+def parse_duration(text: str) -> int:
+    m = re.search(r"completion time in minutes\s*=\s*(?:max\s*)?(\d+)", text, re.I)
+    if not m:
+        m = re.search(r"(\d+)\s*(?:min|minutes)\b", text, re.I)
+    return int(m.group(1)) if m else 0
+
+
+def parse_flag(soup: BeautifulSoup, label: str) -> bool:
+    for el in soup.find_all(text=re.compile(label, re.I)):
+        parent = el.find_parent()
+        if not parent:
+            continue
+        for node in [parent] + list(parent.parents)[:2]:
+            for span in node.find_all("span"):
+                cls = " ".join(span.get("class") or [])
+                if "-yes" in cls:
+                    return True
+                if "-no" in cls:
+                    return False
+    return False
+
+
 def extract_detail_fields(html: str, url: str) -> Dict[str, Any]:
     soup = BeautifulSoup(html, "html.parser")
     name = ""
@@ -90,9 +126,20 @@ def extract_detail_fields(html: str, url: str) -> Dict[str, Any]:
     for el in soup.find_all(text=re.compile(r"Languages", re.I)):
         parent = el.find_parent()
         if parent:
-            langs = [d.text.strip() for d in parent.find_all("div") if d.text.strip()]
+            langs = [d.text for d in parent.find_all("div") if d.text.strip()]
+            if not langs:
+                nxt = parent.find_next_sibling()
+                langs = nxt.text.split(",") if nxt and nxt.text else []
+            langs = [x.strip().rstrip(",").strip() for x in langs if x.strip().rstrip(",").strip()]
             if langs:
-                language = "en"
+                language = ", ".join(dict.fromkeys(langs))
+                break
+    duration = 0
+    for el in soup.find_all(text=re.compile(r"Completion Time", re.I)):
+        parent = el.find_parent()
+        if parent:
+            duration = parse_duration(parent.text) or parse_duration(el)
+            if duration:
                 break
     return {
         "name": name,
@@ -101,20 +148,86 @@ def extract_detail_fields(html: str, url: str) -> Dict[str, Any]:
         "skills": skills,
         "tags": tags,
         "language": language,
+        "duration": duration,
+        "remote": parse_flag(soup, r"Remote Testing"),
+        "adaptive": parse_flag(soup, r"Adaptive/IRT"),
         "url": normalize_url(url),
     }
 
 
-async def collect_catalog_links() -> List[str]:
+class HostRateLimiter:
+    def __init__(self, rate: float = RATE_PER_HOST):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at: Dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        now = time.monotonic()
+        at = max(now, self.next_at.get(host, 0.0))
+        self.next_at[host] = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+def make_client(concurrency: int = CONCURRENCY) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=30,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+
+
+async def fetch(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: HostRateLimiter,
+    headers: Optional[Dict[str, str]] = None,
+    retries: int = RETRIES,
+) -> Tuple[int, str, Dict[str, str]]:
+    for attempt in range(retries + 1):
+        await limiter.wait(url)
+        try:
+            r = await client.get(url, headers=headers)
+            if r.status_code not in RETRY_STATUS or attempt == retries:
+                return r.status_code, r.text, dict(r.headers)
+        except httpx.HTTPError:
+            if attempt == retries:
+                return 0, "", {}
+        await asyncio.sleep(BACKOFF * (2 ** attempt))
+    return 0, "", {}
+
+
+async def scroll_to_end(page) -> None:
+    last = -1
+    stable = 0
+    for _ in range(SCROLL_ROUNDS):
+        await page.keyboard.press("End")
+        try:
+            await page.wait_for_load_state("networkidle", timeout=2000)
+        except Exception:
+            pass
+        height = await page.evaluate("document.body.scrollHeight")
+        if height == last:
+            stable += 1
+            if stable >= 2:
+                break
+        else:
+            stable = 0
+            last = height
+
+
+async def collect_catalog_links(client: httpx.AsyncClient, limiter: HostRateLimiter) -> Tuple[List[str], bool]:
     links = []
+    complete = True
     try:
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
             page = await browser.new_page()
             await page.goto(CATALOG_URL, wait_until="networkidle")
-            for _ in range(50):
-                await page.keyboard.press("End")
-                await asyncio.sleep(0.2)
+            await scroll_to_end(page)
             html = await page.content()
             await browser.close()
         soup = BeautifulSoup(html, "html.parser")
@@ -122,63 +235,137 @@ async def collect_catalog_links() -> List[str]:
             href = a["href"]
             if "/products/product-catalog/view/" in href:
                 links.append(normalize_url(href))
+        complete = bool(links)
     except Exception:
-        pass
+        complete = False
     try:
-        r = requests.get(KENEXA_URL, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
-        soup2 = BeautifulSoup(r.text, "html.parser")
+        code, body, _ = await fetch(client, KENEXA_URL, limiter)
+        complete = complete and code == 200
+        soup2 = BeautifulSoup(body, "html.parser")
         for a in soup2.find_all("a", href=True):
             href = a["href"]
             if "/c/global/ibm-kenexa-catalog/view/" in href:
                 links.append(normalize_url(href))
     except Exception:
-        pass
-    links = list(dict.fromkeys(links))
-    return links
+        complete = False
+    return list(dict.fromkeys(links)), complete
+
+
+def filter_attrs(a: Assessment) -> Tuple[str, int, bool, bool]:
+    return a.language, a.duration, a.remote, a.adaptive
+
+
+def build_assessment(data: Dict[str, Any]) -> Assessment:
+    item = Assessment(
+        id=canonical_id(data["url"]),
+        name=data["name"],
+        url=data["url"],
+        type=data["type"],
+        description=data["description"],
+        skills=data["skills"],
+        tags=data["tags"],
+        language=data["language"],
+        scraped_at=now_iso(),
+        duration=data.get("duration", 0),
+        remote=data.get("remote", False),
+        adaptive=data.get("adaptive", False),
+    )
+    item.content_hash = content_hash(item)
+    return item
+
+
+async def scrape_links(
+    links: List[str],
+    client: httpx.AsyncClient,
+    limiter: HostRateLimiter,
+    concurrency: int = CONCURRENCY,
+    workers: Optional[int] = PARSE_WORKERS,
+    previous: Optional[Dict[str, Assessment]] = None,
+    meta: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Assessment]:
+    sem = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    previous = previous or {}
+    meta = meta if meta is not None else {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        async def one(u: str) -> Optional[Assessment]:
+            prev = previous.get(u)
+            hdrs = {}
+            m = meta.get(u) if prev is not None else None
+            if m and m.get("etag"):
+                hdrs["If-None-Match"] = m["etag"]
+            if m and m.get("last_modified"):
+                hdrs["If-Modified-Since"] = m["last_modified"]
+            async with sem:
+                code, body, rh = await fetch(client, u, limiter, headers=hdrs)
+            if code == 304 and prev is not None:
+                return prev
+            if code != 200:
+                return None if code in GONE_STATUS else prev
+            meta[u] = {"etag": rh.get("etag"), "last_modified": rh.get("last-modified")}
+            data = await loop.run_in_executor(pool, extract_detail_fields, body, u)
+            item = build_assessment(data)
+            if prev is not None and prev.content_hash == item.content_hash and filter_attrs(prev) == filter_attrs(item):
+                return prev
+            return item
 
+        results = await asyncio.gather(*(one(u) for u in links))
+    return [r for r in results if r is not None]
 
-def fetch(url: str) -> Tuple[int, str]:
-    hdrs = {"User-Agent": "Mozilla/5.0"}
-    r = requests.get(url, headers=hdrs, timeout=30)
-    return r.status_code, r.text
 
+async def scrape_async(
+    links: Optional[List[str]] = None,
+    concurrency: int = CONCURRENCY,
+    rate: float = RATE_PER_HOST,
+    previous: Optional[Dict[str, Assessment]] = None,
+    meta: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Assessment]:
+    limiter = HostRateLimiter(rate)
+    async with make_client(concurrency) as client:
+        if links is None:
+            links, complete = await collect_catalog_links(client, limiter)
+            if not complete and previous:
+                links = list(dict.fromkeys(links + list(previous)))
+        return await scrape_links(links, client, limiter, concurrency=concurrency, previous=previous, meta=meta)
 
-def scrape() -> List[Assessment]:
+
+def scrape(previous: Optional[Dict[str, Assessment]] = None, meta: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Assessment]:
     ensure_dirs()
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    links = loop.run_until_complete(collect_catalog_links())
-    loop.close()
-    items = []
-    for u in links:
-        code, body = fetch(u)
-        if code != 200:
-            continue
-        data = extract_detail_fields(body, u)
-        aid = canonical_id(data["url"])
-        item = Assessment(
-            id=aid,
-            name=data["name"],
-            url=data["url"],
-            type=data["type"],
-            description=data["description"],
-            skills=data["skills"],
-            tags=data["tags"],
-            language=data["language"],
-            scraped_at=now_iso(),
-        )
-        items.append(item)
-    return items
+    return asyncio.run(scrape_async(previous=previous, meta=meta))
+
+
+def load_http_meta() -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(HTTP_META_FILE):
+        return {}
+    with open(HTTP_META_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_http_meta(meta: Dict[str, Dict[str, Any]]) -> None:
+    ensure_dirs()
+    tmp = HTTP_META_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, HTTP_META_FILE)
 
 
 def persist(items: List[Assessment]) -> None:
     ensure_dirs()
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        for it in items:
-            f.write(it.to_json() + "\n")
+    write_jsonl(OUTPUT_FILE, items)
+    write_store((a.__dict__ for a in items), OUTPUT_FILE)
 
 
-def run() -> Dict[str, Any]:
-    items = scrape()
-    persist(items)
-    return {"count": len(items), "output": OUTPUT_FILE}
+def run(incremental: bool = False) -> Dict[str, Any]:
+    previous = {a.url: a for a in read_jsonl(OUTPUT_FILE)} if incremental else None
+    meta = load_http_meta() if incremental else {}
+    items = scrape(previous, meta)
+    if incremental and previous and not items:
+        return {"count": len(previous), "output": OUTPUT_FILE, "changed": 0}
+    reused = sum(1 for a in items if previous and previous.get(a.url) is a)
+    changed = len(items) - reused
+    removed = len(set(previous or {}) - set(a.url for a in items))
+    if not incremental or changed or removed:
+        persist(items)
+    save_http_meta(meta)
+    return {"count": len(items), "output": OUTPUT_FILE, "changed": changed, "removed": removed}
@@ -0,0 +1,111 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+import uvicorn
+
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+WORKER_THREADS = int(os.getenv("SHL_WORKER_THREADS", "1"))
+RESTART_DELAY = float(os.getenv("SHL_RESTART_DELAY", "1"))
+RESTART_MAX_DELAY = 30.0
+MAX_FAST_RESTARTS = int(os.getenv("SHL_MAX_FAST_RESTARTS", "5"))
+HEALTHY_AFTER = 10.0
+
+
+def set_torch_threads(n: int) -> None:
+    try:
+        import torch
+
+        torch.set_num_threads(n)
+    except ImportError:
+        pass
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    from .. import app as app_module
+
+    app_module.bootstrap()
+    if app_module.rec is None:
+        raise RuntimeError("failed to load the recommender") from app_module.bootstrap_error
+    app_module.rec.get_model()
+    return app_module
+
+
+def run_worker(app_module, sock: socket.socket) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    set_torch_threads(WORKER_THREADS)
+    app_module.rec.after_fork()
+    config = uvicorn.Config(app_module.app, lifespan="on", log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = WORKERS) -> None:
+    if workers <= 1:
+        uvicorn.run("src.app:app", host=host, port=port, reload=False)
+        return
+    set_torch_threads(1)
+    app_module = preload()
+    sock = bind_socket(host, port)
+    gc.collect()
+    gc.freeze()
+    children: Dict[int, float] = {}
+    stopping = False
+    fast = 0
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(app_module, sock)
+            except BaseException:
+                code = 1
+            os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        fast = fast + 1 if time.monotonic() - started < HEALTHY_AFTER else 0
+        if fast > MAX_FAST_RESTARTS:
+            print("worker %d keeps exiting at startup; not restarting" % pid, file=sys.stderr)
+            continue
+        if fast:
+            time.sleep(min(RESTART_MAX_DELAY, RESTART_DELAY * 2 ** (fast - 1)))
+        if not stopping:
+            spawn()
+    sock.close()
@@ -0,0 +1,40 @@
+from typing import List, Iterator
+import numpy as np
+
+
+def save_strings(prefix: str, strings: List[str]) -> None:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    np.save(prefix + ".offsets.npy", offsets)
+    np.save(prefix + ".blob.npy", blob)
+
+
+def load_array(path: str) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        return np.load(path)
+
+
+class StringTable:
+    def __init__(self, prefix: str):
+        self.offsets = load_array(prefix + ".offsets.npy")
+        self.blob = load_array(prefix + ".blob.npy")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.blob[lo:hi].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self) -> List[str]:
+        data = self.blob.tobytes()
+        off = self.offsets.tolist()
+        return [data[off[i] : off[i + 1]].decode("utf-8") for i in range(len(off) - 1)]
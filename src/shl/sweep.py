@@ -0,0 +1,157 @@
+import os
+import math
+import time
+import itertools
+from functools import partial
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .evaluator import read_train, ensure_dirs, OUTPUT_DIR
+from .fusion import QueryBatch, fuse, empty_hits, DENSE_MAX, FUSION_METHOD, SEM_WEIGHT
+from .querypre import prepare
+from .recommender import Recommender, normalize_query
+
+
+WEIGHTS = [0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+POOLS = [20, 50, 100, 200]
+KS = [1, 3, 5, 10]
+METHODS = [FUSION_METHOD]
+SWEEP_WORKERS = int(os.getenv("SHL_SWEEP_WORKERS", str(os.cpu_count() or 1)))
+
+ENGINE = None
+
+
+def group_queries(train: List[Dict[str, Any]]) -> Tuple[List[str], List[List[str]]]:
+    grouped: Dict[str, List[str]] = {}
+    for row in train:
+        gts = grouped.setdefault(row["query"], [])
+        for u in row["ground_truth"]:
+            u = u.strip().lower()
+            if u not in gts:
+                gts.append(u)
+    return list(grouped), list(grouped.values())
+
+
+def recall_at(pred: List[str], gt: List[str], k: int) -> float:
+    if not gt:
+        return 0.0
+    return len(set(pred[:k]) & set(gt)) / float(len(gt))
+
+
+def average_precision_at(pred: List[str], gt: List[str], k: int) -> float:
+    if not gt:
+        return 0.0
+    s = set(gt)
+    hits = 0
+    total = 0.0
+    for i, u in enumerate(pred[:k]):
+        if u in s:
+            hits += 1
+            total += hits / float(i + 1)
+    return total / float(min(len(s), k))
+
+
+def ndcg_at(pred: List[str], gt: List[str], k: int) -> float:
+    if not gt:
+        return 0.0
+    s = set(gt)
+    dcg = sum(1.0 / math.log2(i + 2) for i, u in enumerate(pred[:k]) if u in s)
+    idcg = sum(1.0 / math.log2(i + 2) for i in range(min(len(s), k)))
+    return dcg / idcg
+
+
+class SweepEngine:
+    def __init__(self, rec: Recommender, queries: List[str], gts: List[List[str]]):
+        self.rec = rec
+        self.queries = queries
+        self.gts = gts
+        texts = [normalize_query(q) for q in queries]
+        self.batch = QueryBatch(texts, [prepare(t) for t in texts])
+        self.raw = []
+        if rec.n_docs and texts:
+            for r in rec.retrievers:
+                self.raw.append(r.search(self.batch, DENSE_MAX) if hasattr(r, "search") else r.retrieve(self.batch, DENSE_MAX))
+
+    def hits(self, qi: int, pool: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        out = []
+        for r, raw in zip(self.rec.retrievers, self.raw):
+            if hasattr(r, "pool"):
+                out.append(r.pool(raw[qi], pool))
+            else:
+                out.append((raw[qi][0][:pool], raw[qi][1][:pool]))
+        return out
+
+    def run(self, method: str, w: float, pool: int, ks: List[int]) -> Dict[str, Any]:
+        rec = self.rec
+        pool = min(pool, DENSE_MAX)
+        weights = {"dense": w, "bm25": 1.0 - w}
+        ws = [weights.get(r.name, r.weight) for r in rec.retrievers]
+        norms = [r.norm for r in rec.retrievers]
+        sums = {}
+        for qi, gt in enumerate(self.gts):
+            if self.raw:
+                fills = [partial(r.fill, self.batch, qi) if hasattr(r, "fill") else None for r in rec.retrievers]
+                idx, scores = fuse(self.hits(qi, pool), ws, norms, pool, method, fills)
+            else:
+                idx, scores = empty_hits()
+            for k in ks:
+                pred = [it["url"].strip().lower() for it in rec.select(idx, scores, k=k)]
+                for name, fn in (("recall", recall_at), ("map", average_precision_at), ("ndcg", ndcg_at)):
+                    key = "%s@%d" % (name, k)
+                    sums[key] = sums.get(key, 0.0) + fn(pred, gt, k)
+        n = max(1, len(self.gts))
+        out: Dict[str, Any] = {"fusion": method, "sem_weight": w, "pool": pool}
+        for key, v in sums.items():
+            out[key] = v / n
+        return out
+
+
+def run_config(cfg: Tuple[str, float, int, List[int]]) -> Dict[str, Any]:
+    return ENGINE.run(*cfg)
+
+
+def sweep(
+    weights: Optional[List[float]] = None,
+    pools: Optional[List[int]] = None,
+    ks: Optional[List[int]] = None,
+    methods: Optional[List[str]] = None,
+    workers: int = SWEEP_WORKERS,
+    encoder: Optional[str] = None,
+) -> Dict[str, Any]:
+    global ENGINE
+    ensure_dirs()
+    weights = weights or WEIGHTS
+    pools = pools or POOLS
+    ks = sorted(set(ks or KS))
+    methods = methods or METHODS
+    t0 = time.perf_counter()
+    queries, gts = group_queries(read_train())
+    rec = Recommender(encoder=encoder, persist_embeddings=True)
+    ENGINE = SweepEngine(rec, queries, gts)
+    t1 = time.perf_counter()
+    cfgs = [(m, w, p, ks) for m, w, p in itertools.product(methods, weights, pools)]
+    if workers > 1 and len(cfgs) > 1 and "fork" in mp.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=min(workers, len(cfgs)), mp_context=mp.get_context("fork")) as ex:
+            rows = list(ex.map(run_config, cfgs))
+    else:
+        rows = [run_config(c) for c in cfgs]
+    kmax = "recall@%d" % ks[-1]
+    rows.sort(key=lambda r: (-r[kmax], -r["ndcg@%d" % ks[-1]], r["pool"], r["sem_weight"], r["fusion"]))
+    outp = os.path.join(OUTPUT_DIR, "sweep.csv")
+    pd.DataFrame(rows).to_csv(outp, index=False)
+    default = [
+        r
+        for r in rows
+        if r["fusion"] == FUSION_METHOD and r["sem_weight"] == SEM_WEIGHT and r["pool"] == max(50, ks[-1] * 5)
+    ]
+    return {
+        "queries": len(queries),
+        "configs": len(rows),
+        "prepare_seconds": t1 - t0,
+        "sweep_seconds": time.perf_counter() - t1,
+        "best": rows[0] if rows else {},
+        "default": default[0] if default else {},
+        "output": outp,
+    }
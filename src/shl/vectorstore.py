@@ -0,0 +1,242 @@
+import os
+import json
+from typing import List, Dict, Any, Tuple, Optional
+import numpy as np
+from .ann import IVFPQIndex, ANN_NPROBE, ANN_RERANK, ANN_MIN_DOCS
+
+
+DATA_DIR = "data"
+CHROMA_DIR = os.path.join(DATA_DIR, "chroma")
+COLLECTION_NAME = "shl_assessments"
+EMB_PATH = os.path.join(DATA_DIR, "embeddings.npy")
+EMB_IDS_PATH = os.path.join(DATA_DIR, "embeddings_ids.json")
+ANN_PATH = os.path.join(DATA_DIR, "embeddings_ivfpq.npz")
+VECTOR_BACKEND = os.getenv("SHL_VECTOR_BACKEND", "chroma")
+
+
+def get_client():
+    import chromadb
+    from chromadb.config import Settings
+
+    os.makedirs(CHROMA_DIR, exist_ok=True)
+    client = chromadb.PersistentClient(path=CHROMA_DIR, settings=Settings(anonymized_telemetry=False))
+    return client
+
+
+def get_collection(client):
+    col = client.get_or_create_collection(name=COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+    return col
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+class ChromaStore:
+    def __init__(self):
+        self.client = get_client()
+        self.col = get_collection(self.client)
+
+    def count(self) -> int:
+        return self.col.count()
+
+    def reopen(self) -> None:
+        from chromadb.api.client import SharedSystemClient
+
+        SharedSystemClient.clear_system_cache()
+        self.client = get_client()
+        self.col = get_collection(self.client)
+
+    def delete(self, ids: List[str]) -> None:
+        self.col.delete(ids=ids)
+
+    def begin(self, ids: List[str]) -> None:
+        pass
+
+    def add_chunk(self, ids: List[str], embs: np.ndarray, docs: List[str], metas: List[Dict[str, Any]]) -> None:
+        self.col.upsert(ids=ids, embeddings=np.asarray(embs, dtype=np.float32), documents=docs, metadatas=metas)
+
+    def commit(self) -> None:
+        pass
+
+    def align(self, ids: List[str]) -> Optional[np.ndarray]:
+        return None
+
+    def query(
+        self, embs: np.ndarray, n: int, rows: Optional[np.ndarray] = None, where: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[List[str]], List[np.ndarray]]:
+        if rows is not None:
+            n = min(n, len(rows))
+        if n <= 0:
+            return [[] for _ in range(len(embs))], [np.zeros(0) for _ in range(len(embs))]
+        res = self.col.query(query_embeddings=embs.tolist(), n_results=n, where=where)
+        sims = [1.0 - np.asarray(d, dtype=np.float64) for d in res["distances"]]
+        return res["ids"], sims
+
+
+class NumpyStore:
+    def __init__(self, path: str = EMB_PATH, ids_path: str = EMB_IDS_PATH):
+        self.path = path
+        self.ids_path = ids_path
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.ids = []
+        self.pending_ids: Optional[List[str]] = None
+        self.pending_pos: Dict[str, int] = {}
+        self.pending: Optional[np.ndarray] = None
+        if os.path.exists(path) and os.path.exists(ids_path):
+            self.matrix = np.load(path, mmap_mode="r")
+            with open(ids_path, "r", encoding="utf-8") as f:
+                self.ids = json.load(f)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def reopen(self) -> None:
+        pass
+
+    def delete(self, ids: List[str]) -> None:
+        drop = set(ids)
+        keep = [i for i, idv in enumerate(self.ids) if idv not in drop]
+        if len(keep) == len(self.ids):
+            return
+        self.write([self.ids[i] for i in keep], np.asarray(self.matrix)[keep])
+
+    def begin(self, ids: List[str]) -> None:
+        self.pending_ids = list(ids)
+        self.pending = None
+
+    def add_chunk(self, ids: List[str], embs: np.ndarray, docs: List[str], metas: List[Dict[str, Any]]) -> None:
+        m = np.array(embs, dtype=np.float32)
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        m /= norms
+        if self.pending is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.pending = np.lib.format.open_memmap(
+                self.path + ".build.npy", mode="w+", dtype=np.float32, shape=(len(self.pending_ids), m.shape[1])
+            )
+            self.pending_pos = {idv: i for i, idv in enumerate(self.pending_ids)}
+            if len(self.ids) and self.matrix.shape[1] == m.shape[1]:
+                pairs = [(self.pending_pos[idv], j) for j, idv in enumerate(self.ids) if idv in self.pending_pos]
+                if pairs:
+                    dst, src = (np.array(x, dtype=np.int64) for x in zip(*pairs))
+                    self.pending[dst] = self.matrix[src]
+        self.pending[[self.pending_pos[idv] for idv in ids]] = m
+
+    def commit(self) -> None:
+        if self.pending is None:
+            return
+        self.pending.flush()
+        self.pending = None
+        os.replace(self.path + ".build.npy", self.path)
+        with open(self.ids_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.pending_ids, f)
+        os.replace(self.ids_path + ".tmp", self.ids_path)
+        self.matrix = np.load(self.path, mmap_mode="r")
+        self.ids = self.pending_ids
+        self.pending_ids = None
+        self.pending_pos = {}
+
+    def write(self, ids: List[str], m: np.ndarray) -> None:
+        m = np.ascontiguousarray(m, dtype=np.float32)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp.npy"
+        np.save(tmp, m)
+        os.replace(tmp, self.path)
+        with open(self.ids_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(ids, f)
+        os.replace(self.ids_path + ".tmp", self.ids_path)
+        self.matrix = np.load(self.path, mmap_mode="r")
+        self.ids = ids
+
+    def align(self, ids: List[str]) -> Optional[np.ndarray]:
+        pos = {idv: i for i, idv in enumerate(self.ids)}
+        return np.array([pos.get(i, -1) for i in ids], dtype=np.int64)
+
+    def query(
+        self, embs: np.ndarray, n: int, rows: Optional[np.ndarray] = None, where: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[List[str]], List[np.ndarray]]:
+        if not self.ids or (rows is not None and not len(rows)):
+            return [[] for _ in range(len(embs))], [np.zeros(0) for _ in range(len(embs))]
+        m = self.matrix if rows is None else self.matrix[rows]
+        scores = np.asarray(embs, dtype=np.float32) @ m.T
+        out_ids = []
+        out_sims = []
+        for row in scores:
+            order = top_k(row, n)
+            idx = order if rows is None else rows[order]
+            out_ids.append([self.ids[i] for i in idx])
+            out_sims.append(row[order].astype(np.float64))
+        return out_ids, out_sims
+
+
+class AnnStore(NumpyStore):
+    def __init__(self, path: str = EMB_PATH, ids_path: str = EMB_IDS_PATH, ann_path: str = ANN_PATH):
+        super().__init__(path, ids_path)
+        self.ann_path = ann_path
+        self.nprobe = ANN_NPROBE
+        self.rerank = ANN_RERANK
+        self.index: Optional[IVFPQIndex] = None
+        if os.path.exists(ann_path):
+            index = IVFPQIndex.load(ann_path)
+            if index.n_docs == len(self.ids) and np.array_equal(index.source, self.source()):
+                self.index = index
+
+    def source(self) -> np.ndarray:
+        st = os.stat(self.path)
+        return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+    def commit(self) -> None:
+        changed = self.pending is not None
+        super().commit()
+        if changed:
+            self.build_index()
+
+    def write(self, ids: List[str], m: np.ndarray) -> None:
+        super().write(ids, m)
+        self.build_index()
+
+    def build_index(self) -> None:
+        self.index = None
+        if len(self.ids) < ANN_MIN_DOCS:
+            if os.path.exists(self.ann_path):
+                os.remove(self.ann_path)
+            return
+        self.index = IVFPQIndex.build(self.matrix)
+        self.index.source = self.source()
+        self.index.save(self.ann_path)
+
+    def query(
+        self, embs: np.ndarray, n: int, rows: Optional[np.ndarray] = None, where: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[List[str]], List[np.ndarray]]:
+        if self.index is None or (rows is not None and len(rows) < ANN_MIN_DOCS):
+            return super().query(embs, n, rows=rows, where=where)
+        mask = None
+        if rows is not None:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[rows] = True
+        embs = np.asarray(embs, dtype=np.float32)
+        out_ids = []
+        out_sims = []
+        for q, cand in zip(embs, self.index.search(embs, n * self.rerank, self.nprobe, mask)):
+            if len(cand) < n:
+                cand = rows if rows is not None else np.arange(len(self.ids))
+            row = self.matrix[cand] @ q
+            order = top_k(row, n)
+            out_ids.append([self.ids[i] for i in cand[order]])
+            out_sims.append(row[order].astype(np.float64))
+        return out_ids, out_sims
+
+
+BACKENDS = {"chroma": ChromaStore, "numpy": NumpyStore, "ann": AnnStore}
+
+
+def get_store(backend: Optional[str] = None):
+    name = backend or VECTOR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError("unknown vector backend: " + name)
+    return BACKENDS[name]()
@@ -0,0 +1,40 @@
+import unittest
+from src.shl import querypre
+
+
+FILLER = " ".join("Collaborate with product managers on roadmap item %d." % i for i in range(30))
+
+
+class PrepareTest(unittest.TestCase):
+    def test_keeps_role_sentences_that_mention_boilerplate_words(self):
+        role = [
+            "Build crypto trading systems in Python.",
+            "Own payroll and compensation processes for the EMEA region.",
+            "Design cookie consent SDKs for mobile apps.",
+        ]
+        chunks, terms = querypre.prepare(" ".join(role) + " " + FILLER)
+        text = " ".join(chunks)
+        for s in role:
+            self.assertIn(s, text)
+        for t in ("crypto", "payroll", "compensation", "cookie"):
+            self.assertIn(t, terms)
+
+    def test_drops_boilerplate_sentences(self):
+        noise = [
+            "We are an equal opportunity employer.",
+            "We offer a competitive salary and 401(k) matching.",
+            "Read our cookie policy before you apply.",
+            "Generous PTO for every employee.",
+        ]
+        chunks, _ = querypre.prepare(FILLER + " " + " ".join(noise))
+        text = " ".join(chunks)
+        for s in noise:
+            self.assertNotIn(s, text)
+        self.assertIn("roadmap item 0", text)
+
+    def test_short_query_is_left_alone(self):
+        self.assertEqual(querypre.prepare("Java developer, competitive salary")[0], ["Java developer, competitive salary"])
+
+
+if __name__ == "__main__":
+    unittest.main()
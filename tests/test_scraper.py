@@ -0,0 +1,143 @@
+import os
+import asyncio
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List
+from src.shl import scraper
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "scraper")
+
+
+class StubServer:
+    def __init__(self):
+        self.pages: Dict[str, str] = {}
+        self.statuses: Dict[str, List[int]] = {}
+        self.etags: Dict[str, str] = {}
+        self.requests: Dict[str, List[Dict[str, str]]] = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.setdefault(self.path, []).append(dict(self.headers))
+                queue = stub.statuses.get(self.path)
+                code = queue.pop(0) if queue else 200
+                etag = stub.etags.get(self.path)
+                if code == 200 and etag and self.headers.get("If-None-Match") == etag:
+                    code = 304
+                body = stub.pages.get(self.path, "").encode("utf-8") if code == 200 else b""
+                if code == 200 and self.path not in stub.pages:
+                    code, body = 404, b""
+                self.send_response(code)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StubServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, path: str) -> str:
+        return "http://127.0.0.1:%d%s" % (self.httpd.server_address[1], path)
+
+    def serve_fixture(self, name: str) -> str:
+        path = "/view/%s/" % name
+        with open(os.path.join(FIXTURES, name + ".html"), "r", encoding="utf-8") as f:
+            self.pages[path] = f.read()
+        return self.url(path)
+
+
+def scrape(links, **kw):
+    return asyncio.run(scraper.scrape_async(links=links, rate=0, **kw))
+
+
+class ScraperTest(unittest.TestCase):
+    def setUp(self):
+        self.backoff = scraper.BACKOFF
+        scraper.BACKOFF = 0.0
+
+    def tearDown(self):
+        scraper.BACKOFF = self.backoff
+
+    def test_scrapes_fixture_pages(self):
+        with StubServer() as s:
+            links = [s.serve_fixture(n) for n in ("java-8-new", "opq32r", "verify-numerical-ability")]
+            items = {a.url: a for a in scrape(links)}
+        self.assertEqual(sorted(items), sorted(links))
+        java = items[links[0]]
+        self.assertEqual(java.name, "Java 8 (New)")
+        self.assertEqual(java.type, "K")
+        self.assertEqual(java.duration, 18)
+        self.assertTrue(java.remote)
+        self.assertFalse(java.adaptive)
+        self.assertIn("Concurrency", java.skills)
+        self.assertEqual(java.id, scraper.canonical_id(links[0]))
+        self.assertEqual(java.content_hash, scraper.content_hash(java))
+        opq = items[links[1]]
+        self.assertEqual(opq.type, "P")
+        self.assertTrue(opq.adaptive)
+        self.assertEqual(opq.language, "English International, French, German, Spanish")
+        self.assertFalse(items[links[2]].remote)
+
+    def test_retries_after_503_and_429(self):
+        with StubServer() as s:
+            url = s.serve_fixture("opq32r")
+            s.statuses["/view/opq32r/"] = [503, 429]
+            items = scrape([url])
+            self.assertEqual(len(s.requests["/view/opq32r/"]), 3)
+        self.assertEqual([a.name for a in items], ["Occupational Personality Questionnaire OPQ32r"])
+
+    def test_conditional_get_returns_previous_on_304(self):
+        with StubServer() as s:
+            url = s.serve_fixture("java-8-new")
+            s.etags["/view/java-8-new/"] = '"v1"'
+            meta: Dict[str, Dict[str, str]] = {}
+            first = scrape([url], meta=meta)
+            self.assertEqual(meta[url]["etag"], '"v1"')
+            second = scrape([url], previous={url: first[0]}, meta=meta)
+            self.assertEqual(s.requests["/view/java-8-new/"][-1].get("If-None-Match"), '"v1"')
+        self.assertIs(second[0], first[0])
+
+    def test_transient_failure_keeps_previous_and_gone_drops_it(self):
+        with StubServer() as s:
+            flaky = s.serve_fixture("java-8-new")
+            gone = s.serve_fixture("opq32r")
+            previous = {a.url: a for a in scrape([flaky, gone])}
+            s.statuses["/view/java-8-new/"] = [500] * (scraper.RETRIES + 1)
+            s.statuses["/view/opq32r/"] = [410]
+            items = scrape([flaky, gone], previous=previous)
+        self.assertEqual([a.url for a in items], [flaky])
+        self.assertIs(items[0], previous[flaky])
+
+    def test_incomplete_link_discovery_rechecks_previous_urls(self):
+        async def discover(client, limiter):
+            return [], False
+
+        original = scraper.collect_catalog_links
+        scraper.collect_catalog_links = discover
+        try:
+            with StubServer() as s:
+                url = s.serve_fixture("verify-numerical-ability")
+                previous = {a.url: a for a in scrape([url])}
+                items = asyncio.run(scraper.scrape_async(rate=0, previous=previous))
+        finally:
+            scraper.collect_catalog_links = original
+        self.assertEqual([a.url for a in items], [url])
+
+
+if __name__ == "__main__":
+    unittest.main()